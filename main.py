@@ -2,10 +2,7 @@ import sys
 import os
 import ctypes
 import multiprocessing
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QFont, QIcon
-from PySide6.QtCore import Qt, qInstallMessageHandler
-from src.frontend.main_window import MainWindow
+from src.cli import COMMANDS, run_cli
 from src.utils.logger import logger
 from src.utils.paths import Paths
 from src.utils.config import Config
@@ -24,6 +21,11 @@ def qt_message_handler(mode, context, message):
 #/////////////////////////////////#
 
 def main():
+    # GUI stack is imported here so headless CLI runs never load PySide6
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QFont, QIcon
+    from PySide6.QtCore import qInstallMessageHandler
+    from src.frontend.main_window import MainWindow
 
     # Taskbar Icon Fix for Windows
     try:
@@ -85,4 +87,6 @@ def main():
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
@@ -0,0 +1,7 @@
+import sys
+import multiprocessing
+from src.cli import run_cli
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(run_cli(sys.argv[1:]))
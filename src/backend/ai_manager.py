@@ -1,7 +1,10 @@
 import os
 import gc
+import threading
+from collections import OrderedDict
+from src.backend.model_variants import ModelVariants
 from src.backend.onnx_engine import ONNXEngine
-from src.utils.paths import Paths
+from src.utils.config import Config
 from src.utils.logger import logger
 
 #/////////////////////////////////#
@@ -9,49 +12,108 @@ from src.utils.logger import logger
 #/////////////////////////////////#
 
 class AIManager:
-    _ocr_engine = None
-    _lama_engine = None
-    _persistent_mode = False
+    """
+    Keeps ONNX sessions warm in a memory-budgeted LRU cache. OCR and LaMa
+    both stay resident while they fit; a new session only evicts the least
+    recently used ones when the budget would be exceeded.
+    """
+    _engines = OrderedDict()  # model file -> {"engine", "mb"}, oldest first
+    _lock = threading.RLock()
+    _budget_mb = None
+    _thread_count = 0
+    _quality = None  # None = Config.MODEL_QUALITY
 
     @staticmethod
-    def set_persistence(enabled: bool):
-        AIManager._persistent_mode = enabled
-        if not enabled:
+    def set_thread_count(threads: int):
+        # Applies to sessions created from now on (0 = let ONNX Runtime decide)
+        AIManager._thread_count = threads
+
+    @staticmethod
+    def set_model_quality(quality):
+        """full / balanced / fast; cached sessions of another precision are dropped"""
+        if quality != AIManager._quality:
+            AIManager._quality = quality
             AIManager.flush()
 
     @staticmethod
-    def get_ocr():
-        if not AIManager._persistent_mode:
-            if AIManager._lama_engine is not None:
-                AIManager._lama_engine = None
-                gc.collect()
+    def set_memory_budget(mb: int):
+        """Caps the resident sessions of this process (0 = auto from available RAM)"""
+        with AIManager._lock:
+            AIManager._budget_mb = mb if mb > 0 else None
+            AIManager._evict(AIManager.get_memory_budget())
+
+    @staticmethod
+    def get_memory_budget():
+        if AIManager._budget_mb is None:
+            AIManager._budget_mb = Config.MODEL_CACHE_BUDGET_MB or AIManager._auto_budget()
+        return AIManager._budget_mb
 
-        if AIManager._ocr_engine is None:
-            path = Paths.get_model("ocr.onnx")
-            if os.path.exists(path):
-                AIManager._ocr_engine = ONNXEngine(path)
-            else:
-                logger.error(f"[X] OCR Model Missing: {path}")
-        return AIManager._ocr_engine
+    @staticmethod
+    def _auto_budget():
+        import psutil
+        available = psutil.virtual_memory().available // (1024 * 1024)
+        return max(Config.MODEL_CACHE_MIN_MB, int(available * Config.MODEL_CACHE_RAM_SHARE))
+
+    @staticmethod
+    def get_ocr():
+        return AIManager._get("ocr.onnx", "OCR")
 
     @staticmethod
     def get_lama():
-        if not AIManager._persistent_mode:
-            if AIManager._ocr_engine is not None:
-                AIManager._ocr_engine = None
-                gc.collect()
+        return AIManager._get("lama.onnx", "LaMa")
+
+    @staticmethod
+    def _get(name, label):
+        with AIManager._lock:
+            entry = AIManager._engines.get(name)
+            if entry is not None:
+                AIManager._engines.move_to_end(name)
+                return entry["engine"]
+
+            path = ModelVariants.resolve(name, AIManager._quality)
+            if not os.path.exists(path):
+                logger.error(f"[X] {label} Model Missing: {path}")
+                return None
+
+            # Make room for at least the weights before the session allocates anything
+            budget = AIManager.get_memory_budget()
+            AIManager._evict(budget - os.path.getsize(path) / (1024 * 1024))
+
+            rss_before = AIManager._rss_mb()
+            engine = ONNXEngine(path, AIManager._thread_count)
+            # GPU sessions keep their weights in VRAM, so never count less than the file itself
+            mb = max(AIManager._rss_mb() - rss_before, os.path.getsize(path) / (1024 * 1024))
+
+            AIManager._engines[name] = {"engine": engine, "mb": mb}
+            AIManager._evict(budget, keep=name)
+            logger.info(f"[+] {label} session cached ({os.path.basename(path)}): {mb:.0f}MB | {AIManager.get_resident_mb():.0f}/{budget}MB resident")
+            return engine
 
-        if AIManager._lama_engine is None:
-            path = Paths.get_model("lama.onnx")
-            if os.path.exists(path):
-                AIManager._lama_engine = ONNXEngine(path)
-            else:
-                logger.error(f"[X] LaMa Model Missing: {path}")
-        return AIManager._lama_engine
+    @staticmethod
+    def _evict(limit_mb, keep=None):
+        # Callers still holding an evicted engine finish their run; the session dies with the last reference
+        evicted = False
+        for name in list(AIManager._engines):
+            if AIManager.get_resident_mb() <= limit_mb: break
+            if name == keep: continue
+            mb = AIManager._engines.pop(name)["mb"]
+            logger.info(f"[i] Evicted {name} from model cache ({mb:.0f}MB)")
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    @staticmethod
+    def get_resident_mb():
+        return sum(e["mb"] for e in AIManager._engines.values())
+
+    @staticmethod
+    def _rss_mb():
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
 
     @staticmethod
     def flush():
-        AIManager._ocr_engine = None
-        AIManager._lama_engine = None
+        with AIManager._lock:
+            AIManager._engines.clear()
         gc.collect()
-        logger.info("[i] VRAM Flushed: Model Memory Released")
\ No newline at end of file
+        logger.info("[i] VRAM Flushed: Model Memory Released")
@@ -1,6 +1,7 @@
 import os
-import cv2
+from concurrent.futures import ThreadPoolExecutor
 from PySide6.QtCore import QObject, Signal
+from src.backend.page_io import PageIO
 from src.utils.config import Config
 from src.utils.paths import Paths
 from src.utils.logger import logger
@@ -16,13 +17,18 @@ class BatchEngine(QObject):
         super().__init__()
         self.files = []
         self.current_index = 0
+        self.done_count = 0
         self.output_dir = ""
         self.export_format = "jpg"
+        # Encoding runs off the GUI thread so page N is written while page N+1 is scanned
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._pending_writes = []
 
     def initialize_batch(self, file_paths, export_format):
         self.files = file_paths
         self.export_format = export_format
         self.current_index = 0
+        self.done_count = 0
         
         batch_id = Config.get_next_batch_id()
         self.output_dir = os.path.join(Paths.PROCESSED, batch_id)
@@ -33,33 +39,40 @@ class BatchEngine(QObject):
         return self.output_dir
 
     def get_next(self):
+        """Hands out the next page; several pages can be in flight when the pool has spare workers"""
         if self.current_index < len(self.files):
             path = self.files[self.current_index]
             self.page_started.emit(path, self.current_index)
+            self.current_index += 1
             return path
         return None
 
-    def save_current(self, cv_img):
+    def save_page(self, path, cv_img):
+        """Exports a finished page and returns True once every page of the batch is done"""
+        self.done_count += 1
         if self.export_format.lower() == "none":
             logger.info("[+] Page processed and kept in session memory.")
-            self.current_index += 1
-            return self.current_index >= len(self.files)
+            return self.done_count >= len(self.files)
 
-        ext = self.export_format if self.export_format not in ["photoshop", "photopea"] else "png"
-        orig_name = os.path.splitext(os.path.basename(self.files[self.current_index]))[0]
-        filename = f"{orig_name}_cleaned.{ext}"
+        filename = PageIO.cleaned_name(path, self.export_format)
         save_path = os.path.join(self.output_dir, filename)
-        
-        # Handle alpha channel conversions on export
-        if len(cv_img.shape) == 3 and cv_img.shape[2] == 4:
-            out_bgr = cv2.cvtColor(cv_img, cv2.COLOR_RGBA2BGRA)
-            if ext.lower() in ['jpg', 'jpeg']:
-                out_bgr = cv2.cvtColor(out_bgr, cv2.COLOR_BGRA2BGR)
-        else:
-            out_bgr = cv2.cvtColor(cv_img, cv2.COLOR_RGB2BGR)
+        # Copy because the live canvas buffer is edited in place by undo/redo
+        self._pending_writes.append(self._writer.submit(self._write_page, cv_img.copy(), save_path, filename))
+        return self.done_count >= len(self.files)
 
-        cv2.imwrite(save_path, out_bgr)
-        
-        logger.info(f"[+] Successfully Saved Cleaned: {filename}")
-        self.current_index += 1
-        return self.current_index >= len(self.files)
+    def skip_page(self):
+        """Counts a page that could not be processed; True once the batch is done"""
+        self.done_count += 1
+        return self.done_count >= len(self.files)
+
+    @staticmethod
+    def _write_page(cv_img, save_path, filename):
+        if PageIO.save(cv_img, save_path):
+            logger.info(f"[+] Successfully Saved Cleaned: {filename}")
+
+    def wait_for_writes(self):
+        """Blocks until every queued page has been encoded to disk"""
+        for future in self._pending_writes:
+            try: future.result()
+            except Exception as e: logger.error(f"Batch export failed: {e}")
+        self._pending_writes.clear()
@@ -0,0 +1,101 @@
+import queue
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.config import Config
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#   STAGED (PIPELINED) BATCH RUN  #
+#/////////////////////////////////#
+
+_DONE = object()
+
+class BatchPipeline:
+    """
+    Runs decode -> scan -> clean -> encode as concurrent stages linked by
+    bounded queues, so page N+1 is decoded and scanned while page N is being
+    inpainted and page N-1 is written. ONNX Runtime and OpenCV release the
+    GIL, so plain threads are enough to overlap the stages.
+    """
+    def __init__(self, load_fn, scan_fn, clean_fn, save_fn,
+                 depth=Config.PIPELINE_DEPTH, decode_threads=Config.PIPELINE_DECODE_THREADS, lanes=1):
+        self.load_fn = load_fn
+        self.scan_fn = scan_fn
+        self.clean_fn = clean_fn
+        self.save_fn = save_fn
+        self.depth = max(1, depth)
+        self.decode_threads = max(1, decode_threads)
+        # Parallel pages per inference stage (one per pool worker when inference runs out of process)
+        self.lanes = max(1, lanes)
+        self.page_done = None  # Optional callback(path, error)
+        self.completed = 0
+        self.failed = []
+
+    def run(self, files):
+        q_scan = queue.Queue(self.depth)
+        q_clean = queue.Queue(self.depth)
+        q_save = queue.Queue(self.depth)
+
+        stages = (self._spawn(q_scan, q_clean, self._scan_step, self.lanes) +
+                  self._spawn(q_clean, q_save, self._clean_step, self.lanes) +
+                  self._spawn(q_save, None, self._save_step, 1))
+
+        # Decoding is fed in page order; the bounded queue caps how far it runs ahead
+        with ThreadPoolExecutor(max_workers=self.decode_threads) as pool:
+            for path in files:
+                q_scan.put({"path": path, "future": pool.submit(self.load_fn, path), "error": None})
+            q_scan.put(_DONE)
+            for t in stages: t.join()
+
+        return self.completed
+
+    def _spawn(self, q_in, q_out, step, count):
+        # The last thread of a stage to see the sentinel forwards it downstream
+        state = {"alive": count, "lock": threading.Lock()}
+        threads = [threading.Thread(target=self._stage, args=(q_in, q_out, step, state), daemon=True) for _ in range(count)]
+        for t in threads: t.start()
+        return threads
+
+    def _stage(self, q_in, q_out, step, state):
+        while True:
+            job = q_in.get()
+            if job is _DONE:
+                q_in.put(_DONE)  # Let sibling threads of this stage see it too
+                with state["lock"]:
+                    state["alive"] -= 1
+                    last = state["alive"] == 0
+                if last and q_out is not None: q_out.put(_DONE)
+                return
+
+            if job["error"] is None:
+                try:
+                    step(job)
+                except Exception as e:
+                    job["error"] = e
+                    logger.error(f"Page failed: {job['path']} | {e}")
+
+            if q_out is not None: q_out.put(job)
+            else: self._finish(job)
+
+    def _scan_step(self, job):
+        img = job.pop("future").result()
+        if img is None:
+            raise ValueError("The file is corrupted or cannot be decoded")
+        job["img"] = img
+        job["mask"] = self.scan_fn(img)
+
+    def _clean_step(self, job):
+        mask = job.pop("mask")
+        # Pages without any detected text are exported untouched
+        if np.any(mask):
+            job["img"] = self.clean_fn(job["img"], mask)
+
+    def _save_step(self, job):
+        self.save_fn(job["path"], job.pop("img"))
+
+    def _finish(self, job):
+        # Only the single save thread calls this, so the counters need no lock
+        if job["error"] is None: self.completed += 1
+        else: self.failed.append(job["path"])
+        if self.page_done: self.page_done(job["path"], job["error"])
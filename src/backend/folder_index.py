@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+import threading
+import cv2
+import numpy as np
+from src.backend.page_io import PageIO
+from src.utils.config import Config
+from src.utils.paths import Paths
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#   PERSISTENT FOLDER PAGE INDEX  #
+#/////////////////////////////////#
+
+class FolderIndex:
+    """
+    What is known about a chapter folder without decoding it, kept in
+    Paths.FOLDER_INDEX across runs. Every page has its size and mtime;
+    header fields (width, height, channels, alpha) are read from the file's
+    first bytes when first asked for; the content hash and a JPEG thumbnail
+    come from one reduced decode. Entries are reset when size or mtime change.
+    """
+    VERSION = 1
+
+    def __init__(self, folder):
+        self.folder = os.path.abspath(folder)
+        key = hashlib.sha1(os.path.normcase(self.folder).encode("utf-8")).hexdigest()[:16]
+        self.file = os.path.join(Paths.FOLDER_INDEX, key + ".json")
+        self.thumb_dir = os.path.join(Paths.FOLDER_INDEX, key)
+        self.entries = self._load()  # file name -> entry
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    def scan(self):
+        """Sorted page paths, from one os.scandir pass (no per-file open or decode)"""
+        names = []
+        with os.scandir(self.folder) as it:
+            for e in it:
+                if not PageIO.is_image(e.name) or not e.is_file(): continue
+                st = e.stat()
+                names.append(e.name)
+                with self.lock:
+                    old = self.entries.get(e.name)
+                    if old is None or old["size"] != st.st_size or old["mtime"] != st.st_mtime_ns:
+                        self.entries[e.name] = {"size": st.st_size, "mtime": st.st_mtime_ns}
+                        self.dirty = True
+
+        with self.lock:
+            for gone in set(self.entries) - set(names):
+                del self.entries[gone]
+                self.dirty = True
+        names.sort()
+        return [os.path.join(self.folder, n) for n in names]
+
+    def info(self, path):
+        """The page's entry, with its header fields parsed on first use"""
+        name = os.path.basename(path)
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None or "width" in entry: return entry
+
+        header = PageIO.read_header(path) or {"width": 0, "height": 0, "channels": 0, "alpha": False}
+        with self.lock:
+            entry.update(header)
+            self.dirty = True
+        return entry
+
+    def thumbnail(self, path):
+        """Path of the page's cached thumbnail, made on first use; None if the page cannot be decoded"""
+        entry = self.info(path)
+        if entry is None: return None
+        thumb = os.path.join(self.thumb_dir, f"{entry['hash']}.jpg") if entry.get("hash") else None
+        if thumb and os.path.exists(thumb): return thumb
+
+        data = np.fromfile(path, dtype=np.uint8)
+        # Reduced decodes skip most of the work for JPEGs; the page is shrunk further below
+        img = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_4)
+        if img is None: return None
+        scale = Config.THUMB_HEIGHT / img.shape[0]
+        if scale < 1:
+            img = cv2.resize(img, (max(1, int(img.shape[1] * scale)), Config.THUMB_HEIGHT), interpolation=cv2.INTER_AREA)
+
+        digest = hashlib.blake2b(data.data, digest_size=16).hexdigest()
+        # Referenced before the file exists, so a concurrent save() never prunes it
+        with self.lock:
+            entry["hash"] = digest
+            self.dirty = True
+        thumb = os.path.join(self.thumb_dir, f"{digest}.jpg")
+        os.makedirs(self.thumb_dir, exist_ok=True)
+        cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])[1].tofile(thumb)
+        return thumb
+
+    def save(self):
+        """Writes the index and deletes thumbnails no entry refers to any more"""
+        with self.lock:
+            if not self.dirty: return
+            # Entries are updated in place by the thumbnail thread, so each one is copied here
+            pages = {name: dict(entry) for name, entry in self.entries.items()}
+            self.dirty = False
+        state = {"version": FolderIndex.VERSION, "folder": self.folder, "pages": pages}
+        try:
+            os.makedirs(Paths.FOLDER_INDEX, exist_ok=True)
+            tmp = f"{self.file}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.file)
+            self._prune()
+        except OSError as e:
+            logger.warning(f"Folder index write failed: {e}")
+
+    def _prune(self):
+        if not os.path.isdir(self.thumb_dir): return
+        # Under the lock: thumbnail() records a hash before writing its file, so nothing in use is removed
+        with self.lock:
+            used = {e["hash"] for e in self.entries.values() if e.get("hash")}
+            with os.scandir(self.thumb_dir) as it:
+                for e in it:
+                    stem, ext = os.path.splitext(e.name)
+                    if ext == ".jpg" and stem not in used:
+                        os.remove(e.path)
+
+    def _load(self):
+        if os.path.exists(self.file):
+            try:
+                with open(self.file, 'r') as f:
+                    state = json.load(f)
+                if state.get("version") == FolderIndex.VERSION:
+                    return state["pages"]
+            except:
+                pass
+        return {}
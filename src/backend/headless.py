@@ -0,0 +1,102 @@
+import os
+import time
+import numpy as np
+from src.backend.ai_manager import AIManager
+from src.backend.batch_pipeline import BatchPipeline
+from src.backend.page_io import PageIO
+from src.backend.pool import (get_pool, broadcast, shutdown_pool, resolve_worker_count,
+                              _run_ocr_shared, _run_clean_shared, _run_warmup, _run_cache_stats)
+from src.backend.processor import ImageProcessor
+from src.backend.result_cache import ResultCache
+from src.backend.shm_transport import SharedArena
+from src.utils.config import Config
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#    HEADLESS (NO-QT) BATCH RUN   #
+#/////////////////////////////////#
+
+class HeadlessBatch:
+    """Scan -> Clean -> Export for a whole folder without a QApplication"""
+
+    def __init__(self, input_dir, output_dir, scan_type="ocr", export_format="png",
+                 tile_size=Config.DEFAULT_TILE_WIDTH, depth=Config.PIPELINE_DEPTH, workers=None):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.scan_type = scan_type
+        self.export_format = export_format
+        self.tile_size = tile_size
+        self.depth = depth
+        self.workers = resolve_worker_count(workers)
+        self.pool = None
+        self.failed = []
+        self._finished = 0
+
+    def run(self):
+        files = PageIO.list_pages(self.input_dir)
+        if not files:
+            logger.warning(f"No pages found in: {self.input_dir}")
+            return 0
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        models = ["ocr", "lama"] if self.scan_type == "ocr" else ["lama"]
+        if (self.scan_type == "ocr" and AIManager.get_ocr() is None) or AIManager.get_lama() is None:
+            # Without models every page would be exported untouched, abort instead
+            self.failed = list(files)
+            logger.critical("Headless batch aborted: AI models are missing")
+            return 0
+
+        logger.info(f"--- HEADLESS BATCH: {len(files)} pages -> {self.output_dir} ---")
+
+        if self.workers > 1:
+            # Each worker process loads its own sessions; pages are spread across them
+            AIManager.flush()
+            self.pool = get_pool(self.workers)
+            for f in broadcast(_run_warmup, models): f.result()
+
+        pipeline = BatchPipeline(PageIO.load, self.scan_page, self.clean_page, self.save_page,
+                                 self.depth, lanes=self.workers)
+        pipeline.page_done = lambda path, error: self._on_page_done(path, error, len(files))
+
+        start = time.perf_counter()
+        try:
+            done = pipeline.run(files)
+            # Each worker process counts its own lookups
+            stats = [f.result() for f in broadcast(_run_cache_stats)] if self.pool else [ResultCache.stats()]
+        finally:
+            if self.pool: shutdown_pool()
+
+        self.failed = pipeline.failed
+        hits, misses = sum(s["hits"] for s in stats), sum(s["misses"] for s in stats)
+        logger.info(f"[+] Headless batch finished: {done}/{len(files)} pages in {time.perf_counter() - start:.1f}s")
+        logger.info(f"[i] Result cache: {hits} hits / {misses} misses")
+        return done
+
+    def _on_page_done(self, path, error, total):
+        self._finished += 1
+        if error is None:
+            logger.info(f"[+] [{self._finished}/{total}] {os.path.basename(path)}")
+
+    def scan_page(self, img):
+        if self.scan_type == "transparency":
+            return ImageProcessor.run_transparency_logic(img)
+        if self.pool:
+            with SharedArena() as arena:
+                out_h = arena.alloc(img.shape[:2], np.uint8)
+                self.pool.submit(_run_ocr_shared, arena.put(img), out_h, "ENG").result()
+                return arena.view(out_h).copy()
+        return ImageProcessor.run_ocr_logic(img)
+
+    def clean_page(self, img, mask):
+        if self.pool:
+            with SharedArena() as arena:
+                out_h = arena.alloc(img.shape, np.uint8)
+                self.pool.submit(_run_clean_shared, arena.put(img), arena.put(mask), out_h, self.tile_size).result()
+                return arena.view(out_h).copy()
+        return ImageProcessor.run_clean_logic(img, mask, self.tile_size)[0]
+
+    def save_page(self, path, img):
+        save_path = os.path.join(self.output_dir, PageIO.cleaned_name(path, self.export_format))
+        if not PageIO.save(img, save_path):
+            raise IOError(f"Could not write {save_path}")
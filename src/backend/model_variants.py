@@ -0,0 +1,174 @@
+import os
+import json
+import numpy as np
+from src.backend.page_io import PageIO
+from src.utils.config import Config
+from src.utils.paths import Paths
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#   QUANTIZED MODEL VARIANTS      #
+#/////////////////////////////////#
+
+class ModelVariants:
+    """
+    Reduced-precision copies of the models (ocr.int8.onnx, lama.fp16.onnx, ...)
+    that ship next to the FP32 originals. resolve() picks one from the provider
+    and Config.MODEL_QUALITY; calibrate() scores a variant against FP32 on
+    sample pages and a failed score keeps it from being auto-selected.
+    """
+    VARIANTS = ["int8", "fp16"]
+    QUALITY = {
+        "full": {"CPU": [], "GPU": []},
+        "balanced": {"CPU": [], "GPU": ["fp16"]},
+        "fast": {"CPU": ["int8"], "GPU": ["fp16"]},
+    }
+    _RESULTS_FILE = os.path.join(Paths.CACHE, "model_variants.json")
+
+    @staticmethod
+    def resolve(name, quality=None):
+        """Path of the model file to load for `name` on this machine"""
+        import onnxruntime as ort
+        device = "GPU" if 'CUDAExecutionProvider' in ort.get_available_providers() else "CPU"
+        for variant in ModelVariants.QUALITY[quality or Config.MODEL_QUALITY][device]:
+            path = Paths.get_model_variant(name, variant)
+            if os.path.exists(path) and ModelVariants.verdict(path) is not False:
+                return path
+        return Paths.get_model(name)
+
+    @staticmethod
+    def verdict(path):
+        """True / False from the last calibration of this exact file, None if never calibrated"""
+        entry = ModelVariants._load_results().get(os.path.basename(path))
+        if not entry or entry["stamp"] != ModelVariants._stamp(path): return None
+        return entry["passed"]
+
+    #/////////////////////////////////#
+    #        VARIANT GENERATION       #
+    #/////////////////////////////////#
+
+    @staticmethod
+    def build(name, variant, sample_dir=None):
+        """
+        Writes models/<name>.<variant>.onnx from the FP32 model. INT8 is
+        static (QDQ, activations calibrated on the sample pages) when samples
+        are given and dynamic (weights only) otherwise.
+        """
+        import onnx
+        src = Paths.get_model(name)
+        dst = Paths.get_model_variant(name, variant)
+
+        if variant == "fp16":
+            from onnxruntime.transformers.float16 import convert_float_to_float16
+            # Inputs / outputs stay float32 so the pre- and post-processing do not change
+            onnx.save(convert_float_to_float16(onnx.load(src), keep_io_types=True), dst)
+        elif sample_dir:
+            from onnxruntime.quantization import quantize_static, QuantFormat, QuantType, CalibrationDataReader
+
+            class _Reader(CalibrationDataReader):
+                def __init__(self, feeds): self.feeds = iter(feeds)
+                def get_next(self): return next(self.feeds, None)
+
+            feeds = ModelVariants._sample_feeds(name, src, sample_dir)
+            quantize_static(src, dst, _Reader(feeds), quant_format=QuantFormat.QDQ, per_channel=True,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+        else:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+
+        logger.info(f"[+] Built {variant} variant: {dst}")
+        return dst
+
+    @staticmethod
+    def _sample_feeds(name, model_path, sample_dir):
+        import onnx
+        from src.backend.processor import ImageProcessor
+        input_name = onnx.load(model_path, load_external_data=False).graph.input[0].name
+        # Generated lazily: the calibrator consumes one feed at a time. The inputs
+        # live in reused TensorBuffers, so each feed gets its own copy
+        for rgb, mask, rects in ModelVariants._samples(sample_dir):
+            if name == "ocr.onnx":
+                yield {input_name: ImageProcessor._ocr_input(rgb).copy()}
+            else:
+                for r in rects:
+                    yield {k: v.copy() for k, v in ImageProcessor._tile_inputs(rgb, mask, [r]).items()}
+
+    #/////////////////////////////////#
+    #   CALIBRATION / QUALITY CHECK   #
+    #/////////////////////////////////#
+
+    @staticmethod
+    def calibrate(name, variant, sample_dir):
+        """
+        Runs FP32 and the variant on the same sample pages. OCR is scored by
+        mask IoU, LaMa by PSNR over the inpainted pixels.
+        """
+        from src.backend.onnx_engine import ONNXEngine
+        from src.backend.processor import ImageProcessor
+        path = Paths.get_model_variant(name, variant)
+        ref, var = ONNXEngine(Paths.get_model(name)), ONNXEngine(path)
+
+        scores = []
+        for rgb, mask, rects in ModelVariants._samples(sample_dir):
+            if name == "ocr.onnx":
+                a = ImageProcessor._ocr_heatmap(ref, rgb) > 0.3
+                b = ImageProcessor._ocr_heatmap(var, rgb) > 0.3
+                union = np.logical_or(a, b).sum()
+                scores.append(np.logical_and(a, b).sum() / union if union else 1.0)
+            else:
+                for r in rects:
+                    sel = mask[r[1]:r[3], r[0]:r[2]] > 127
+                    a = ImageProcessor._infer_tiles(ref, rgb, mask, [r])[0][sel].astype(np.float32)
+                    b = ImageProcessor._infer_tiles(var, rgb, mask, [r])[0][sel].astype(np.float32)
+                    mse = np.mean((a - b) ** 2) if a.size else 0.0
+                    scores.append(10 * np.log10(255.0 ** 2 / mse) if mse > 0 else 99.0)
+
+        if not scores:
+            logger.warning(f"No usable calibration samples in: {sample_dir}")
+            return None
+
+        metric = "iou" if name == "ocr.onnx" else "psnr"
+        score = float(np.mean(scores))
+        passed = score >= (Config.VARIANT_MIN_IOU if metric == "iou" else Config.VARIANT_MIN_PSNR)
+        results = ModelVariants._load_results()
+        results[os.path.basename(path)] = {"stamp": ModelVariants._stamp(path), "metric": metric,
+                                           "score": round(score, 4), "samples": len(scores), "passed": passed}
+        with open(ModelVariants._RESULTS_FILE, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        logger.info(f"[{'+' if passed else 'X'}] {os.path.basename(path)}: {metric} {score:.3f} over {len(scores)} samples "
+                    f"-> {'selectable' if passed else 'disabled'}")
+        return passed
+
+    @staticmethod
+    def _samples(sample_dir):
+        """(rgb, text mask, LaMa tile rects) for the first CALIBRATION_PAGES pages, scanned with FP32 OCR"""
+        import cv2
+        from src.backend.onnx_engine import ONNXEngine
+        from src.backend.processor import ImageProcessor
+        from src.backend.tile_planner import TilePlanner
+        ocr = ONNXEngine(Paths.get_model("ocr.onnx"))
+
+        for path in PageIO.list_pages(sample_dir)[:Config.CALIBRATION_PAGES]:
+            img = PageIO.load(path)
+            if img is None: continue
+            # One detector window is plenty for a quality sample and keeps strips cheap
+            rgb = np.ascontiguousarray(img[:Config.OCR_WINDOW, :Config.OCR_WINDOW, :3])
+            mask = (ImageProcessor._ocr_heatmap(ocr, rgb) > 0.3).astype(np.uint8) * 255
+            mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (15, 15)))
+            yield rgb, mask, [t["rect"] for t in TilePlanner.plan(mask, Config.DEFAULT_TILE_WIDTH)]
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return f"{st.st_size}:{int(st.st_mtime)}"
+
+    @staticmethod
+    def _load_results():
+        if os.path.exists(ModelVariants._RESULTS_FILE):
+            try:
+                with open(ModelVariants._RESULTS_FILE, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
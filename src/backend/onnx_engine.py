@@ -1,4 +1,8 @@
+import os
+import hashlib
 import numpy as np
+from src.utils.config import Config
+from src.utils.paths import Paths
 from src.utils.logger import logger
 
 #/////////////////////////////////#
@@ -6,29 +10,28 @@ from src.utils.logger import logger
 #/////////////////////////////////#
 
 class ONNXEngine:
-    def __init__(self, model_path):
+    def __init__(self, model_path, intra_threads=0):
         import onnxruntime as ort
 
         providers = ort.get_available_providers()
-        
-        sess_opt = ort.SessionOptions()
-        sess_opt.enable_mem_pattern = False 
-        sess_opt.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
-        
+        profile = Config.get_ort_profile()
+        if intra_threads > 0:
+            # Each pool worker gets its own slice of the cores
+            profile["intra_op_threads"] = intra_threads
+
         success = False
         if 'CUDAExecutionProvider' in providers:
             try:
                 cuda_options = {
                     'device_id': 0,
                     'arena_extend_strategy': 'kSameAsRequested',
-                    'cudnn_conv_algo_search': 'HEURISTIC', 
+                    'cudnn_conv_algo_search': 'HEURISTIC',
                     'do_copy_in_default_stream': True,
                 }
-                
-                self.session = ort.InferenceSession(
-                    model_path, 
-                    sess_options=sess_opt,
-                    providers=[('CUDAExecutionProvider', cuda_options), 'CPUExecutionProvider']
+
+                self.session = ONNXEngine._create_session(
+                    model_path, profile,
+                    [('CUDAExecutionProvider', cuda_options), 'CPUExecutionProvider'], "cuda"
                 )
                 self.device = "GPU"
                 success = True
@@ -36,17 +39,111 @@ class ONNXEngine:
                 logger.warning(f"CUDA initialization error: {e}")
 
         if not success:
-            self.session = ort.InferenceSession(
-                model_path, 
-                sess_options=sess_opt,
-                providers=['CPUExecutionProvider']
+            self.session = ONNXEngine._create_session(
+                model_path, profile, ['CPUExecutionProvider'], "cpu"
             )
             self.device = "CPU"
-            
+
+        # Identifies the weights in result-cache keys (a rebuilt variant gets a new stamp)
+        st = os.stat(model_path)
+        self.model_id = f"{os.path.basename(model_path)}:{st.st_size}:{int(st.st_mtime)}"
         self.input_names = [i.name for i in self.session.get_inputs()]
+        self.output_names = [o.name for o in self.session.get_outputs()]
+        self.io_binding = profile["io_binding"]
+        # A symbolic (string / None) leading dim means the export accepts batch > 1
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.dynamic_batch = not isinstance(batch_dim, int)
         logger.info(f"Engine Ready | Device: {self.device} | {model_path}")
 
     def run(self, input_data):
         if isinstance(input_data, dict):
             return self.session.run(None, input_data)
         return self.session.run(None, {self.input_names[0]: input_data})
+
+    def run_into(self, feeds, out):
+        """
+        Runs a model whose first output has the shape of `out`. With IOBinding
+        the output is written into `out` instead of a fresh array; otherwise
+        (or if the binding is rejected) the session's own output is returned.
+        """
+        if self.io_binding:
+            try:
+                binding = self.session.io_binding()
+                for name, arr in feeds.items():
+                    binding.bind_cpu_input(name, arr)
+                binding.bind_output(self.output_names[0], "cpu", 0, out.dtype, out.shape, out.ctypes.data)
+                self.session.run_with_iobinding(binding)
+                return out
+            except Exception as e:
+                logger.warning(f"IOBinding unavailable, using plain runs: {e}")
+                self.io_binding = False
+        return self.session.run(None, feeds)[0]
+
+    #/////////////////////////////////#
+    #  SESSION PROFILE & MODEL CACHE  #
+    #/////////////////////////////////#
+
+    _OPT_LEVELS = {"disable": "ORT_DISABLE_ALL", "basic": "ORT_ENABLE_BASIC",
+                   "extended": "ORT_ENABLE_EXTENDED", "all": "ORT_ENABLE_ALL"}
+
+    @staticmethod
+    def _session_options(profile, opt_level):
+        import onnxruntime as ort
+        sess_opt = ort.SessionOptions()
+        sess_opt.graph_optimization_level = getattr(ort.GraphOptimizationLevel, ONNXEngine._OPT_LEVELS[opt_level])
+        sess_opt.enable_mem_pattern = profile["mem_pattern"]
+        sess_opt.enable_cpu_mem_arena = profile["cpu_arena"]
+        sess_opt.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if profile["execution_mode"] == "parallel"
+                                   else ort.ExecutionMode.ORT_SEQUENTIAL)
+        if profile["intra_op_threads"] > 0: sess_opt.intra_op_num_threads = profile["intra_op_threads"]
+        if profile["inter_op_threads"] > 0: sess_opt.inter_op_num_threads = profile["inter_op_threads"]
+        return sess_opt
+
+    @staticmethod
+    def _create_session(model_path, profile, providers, provider_tag):
+        """Loads the graph optimized on a previous launch, or optimizes it once and stores it"""
+        import onnxruntime as ort
+        level = profile["graph_optimization"]
+        # Level "all" adds layout rewrites (NCHWc) tuned to this CPU. The app folder is portable, so only
+        # the hardware-neutral "extended" graph is stored and the layout passes run again at every load
+        stored = "extended" if level == "all" else level
+        cached = ONNXEngine.optimized_model_path(model_path, provider_tag, stored) if profile["cache_optimized_model"] and level != "disable" else None
+
+        if cached and not os.path.exists(cached):
+            sess_opt = ONNXEngine._session_options(profile, stored)
+            # Written next to the final name and renamed, so a crashed launch never leaves half a file
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            sess_opt.optimized_model_filepath = cached + f".{os.getpid()}.tmp"
+            session = ort.InferenceSession(model_path, sess_options=sess_opt, providers=providers)
+            if os.path.exists(sess_opt.optimized_model_filepath):
+                try:
+                    os.replace(sess_opt.optimized_model_filepath, cached)
+                    logger.info(f"[+] Optimized model cached: {os.path.basename(cached)}")
+                except OSError as e:
+                    logger.warning(f"Could not store optimized model: {e}")
+            if stored == level: return session
+
+        if cached and os.path.exists(cached):
+            try:
+                # Already optimized: skip the graph passes that make cold starts slow
+                sess_opt = ONNXEngine._session_options(profile, "all" if level == "all" else "disable")
+                session = ort.InferenceSession(cached, sess_options=sess_opt, providers=providers)
+                logger.info(f"[+] Loaded optimized model from cache: {os.path.basename(cached)}")
+                return session
+            except Exception as e:
+                logger.warning(f"Optimized model cache entry unusable, rebuilding on next launch: {e}")
+                os.remove(cached)
+
+        sess_opt = ONNXEngine._session_options(profile, level)
+        return ort.InferenceSession(model_path, sess_options=sess_opt, providers=providers)
+
+    @staticmethod
+    def optimized_model_path(model_path, provider_tag, level):
+        """Cache entry keyed by model file (path, size, mtime) + ORT version + provider + optimization level"""
+        # The file's stat stands in for its content: hashing hundreds of MB on every load would eat the saving
+        import onnxruntime as ort
+        st = os.stat(model_path)
+        digest = hashlib.sha1(f"{os.path.abspath(model_path)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8"))
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        key = f"{digest.hexdigest()[:16]}_ort{ort.__version__}_{provider_tag}_{level}"
+        return os.path.join(Paths.ORT_CACHE, f"{stem}_{key}.onnx")
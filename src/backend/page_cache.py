@@ -0,0 +1,97 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.backend.page_io import PageIO
+from src.utils.config import Config
+
+#/////////////////////////////////#
+#   DECODED PAGE PREFETCH CACHE   #
+#/////////////////////////////////#
+
+class PageCache:
+    """
+    Decodes pages on a small thread pool ahead of use and keeps them in an
+    LRU bounded by Config.PREFETCH_CACHE_MB. take() hands the page over to
+    the caller (it leaves the cache), joining an in-flight decode instead of
+    starting a second one and decoding inline only on a cold miss. Entries
+    are dropped if the file changed on disk since it was decoded.
+    """
+    def __init__(self, budget_mb=None, threads=None):
+        self.budget = (budget_mb or Config.PREFETCH_CACHE_MB) * 1024 * 1024
+        self.pool = ThreadPoolExecutor(max_workers=threads or Config.PREFETCH_THREADS)
+        self.pages = OrderedDict()  # path -> (stamp, img or None if undecodable), oldest first
+        self.pending = {}  # path -> (future, group)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, paths, group="browse"):
+        """
+        Queues decodes for the pages not cached yet. Queued decodes of the
+        same group that are no longer wanted are cancelled, so scrolling fast
+        through the list never builds a backlog.
+        """
+        wanted = set(paths)
+        with self.lock:
+            for path, (future, g) in list(self.pending.items()):
+                if g == group and path not in wanted and future.cancel():
+                    del self.pending[path]
+            for path in paths:
+                if path in self.pages:
+                    self.pages.move_to_end(path)
+                elif path not in self.pending:
+                    self.pending[path] = (self.pool.submit(self._decode, path), group)
+
+    def take(self, path):
+        """The decoded page (RGB / RGBA, or None if unreadable); the cache gives up its copy"""
+        with self.lock:
+            job = self.pending.get(path)
+            # Still queued behind other pages: decoding it here is quicker than waiting its turn
+            if job is not None and job[0].cancel():
+                del self.pending[path]
+                job = None
+        if job is not None:
+            job[0].result()
+
+        with self.lock:
+            entry = self.pages.pop(path, None)
+            if entry is not None: self.nbytes -= PageCache._size(entry[1])
+        if entry is not None and entry[0] == PageCache._stamp(path):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return PageIO.load(path)
+
+    def clear(self):
+        with self.lock:
+            for future, _ in self.pending.values(): future.cancel()
+            self.pending.clear()
+            self.pages.clear()
+            self.nbytes = 0
+
+    def _decode(self, path):
+        stamp = PageCache._stamp(path)
+        img = PageIO.load(path) if stamp else None
+        with self.lock:
+            # A clear() while decoding drops the result
+            if path not in self.pending: return
+            del self.pending[path]
+            self.pages[path] = (stamp, img)
+            self.nbytes += PageCache._size(img)
+            while self.nbytes > self.budget and len(self.pages) > 1:
+                _, (_, old) = self.pages.popitem(last=False)
+                self.nbytes -= PageCache._size(old)
+
+    @staticmethod
+    def _size(img):
+        return img.nbytes if img is not None else 0
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
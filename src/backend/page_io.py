@@ -0,0 +1,144 @@
+import os
+import struct
+import cv2
+import numpy as np
+from src.utils.config import Config
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#     PAGE DECODE / ENCODE I/O    #
+#/////////////////////////////////#
+
+class PageIO:
+    IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp')
+
+    @staticmethod
+    def is_image(name):
+        return name.lower().endswith(PageIO.IMAGE_EXTS)
+
+    @staticmethod
+    def list_pages(folder):
+        """Returns the sorted page paths of a chapter folder"""
+        with os.scandir(folder) as it:
+            names = sorted(e.name for e in it if PageIO.is_image(e.name) and e.is_file())
+        return [os.path.join(folder, f) for f in names]
+
+    @staticmethod
+    def read_header(path):
+        """
+        {"width", "height", "channels", "alpha"} from the first bytes of a
+        PNG / JPEG / WebP file, without decoding it. channels is what load()
+        returns (4 with alpha, else 3). None if the header is not understood.
+        """
+        try:
+            with open(path, "rb") as f:
+                head = f.read(Config.HEADER_READ_BYTES)
+        except OSError:
+            return None
+
+        info = None
+        if head[:8] == b"\x89PNG\r\n\x1a\n":
+            info = PageIO._png_header(head)
+        elif head[:2] == b"\xff\xd8":
+            info = PageIO._jpeg_header(head)
+        elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            info = PageIO._webp_header(head)
+        if info is None: return None
+        w, h, alpha = info
+        return {"width": w, "height": h, "channels": 4 if alpha else 3, "alpha": alpha}
+
+    @staticmethod
+    def _png_header(head):
+        if len(head) < 26 or head[12:16] != b"IHDR": return None
+        w, h = struct.unpack(">II", head[16:24])
+        color_type = head[25]
+        if color_type in (4, 6): return w, h, True
+        # Palette / gray / RGB pages only carry alpha through a tRNS chunk ahead of the pixel data
+        pos = 33
+        while pos + 8 <= len(head):
+            length, kind = struct.unpack(">I4s", head[pos:pos + 8])
+            if kind == b"tRNS": return w, h, True
+            if kind in (b"IDAT", b"IEND"): break
+            pos += 12 + length
+        return w, h, False
+
+    @staticmethod
+    def _jpeg_header(head):
+        pos = 2
+        while pos + 9 <= len(head):
+            if head[pos] != 0xFF:
+                return None
+            marker = head[pos + 1]
+            if marker == 0xFF:  # Fill byte
+                pos += 1
+                continue
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+            # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC) carry the frame size
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                h, w = struct.unpack(">HH", head[pos + 5:pos + 9])
+                return w, h, False
+            pos += 2 + length
+        return None
+
+    @staticmethod
+    def _webp_header(head):
+        kind = head[12:16]
+        if kind == b"VP8 " and len(head) >= 30:
+            w, h = struct.unpack("<HH", head[26:30])
+            return w & 0x3FFF, h & 0x3FFF, False
+        if kind == b"VP8L" and len(head) >= 25:
+            bits = struct.unpack("<I", head[21:25])[0]
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, bool((bits >> 28) & 1)
+        if kind == b"VP8X" and len(head) >= 30:
+            w = int.from_bytes(head[24:27], "little") + 1
+            h = int.from_bytes(head[27:30], "little") + 1
+            return w, h, bool(head[20] & 0x10)
+        return None
+
+    @staticmethod
+    def load(path):
+        """Decodes a page into RGB / RGBA. np.fromfile keeps unicode paths working on Windows"""
+        img_data = np.fromfile(path, dtype=np.uint8)
+        img = cv2.imdecode(img_data, cv2.IMREAD_UNCHANGED)
+        if img is None: return None
+
+        if len(img.shape) == 2: img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+        elif len(img.shape) == 3 and img.shape[2] == 4: img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
+        else: img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return img
+
+    @staticmethod
+    def export_ext(export_format):
+        # Editor bridges pick up lossless PNGs from the batch folder
+        return export_format if export_format not in ["photoshop", "photopea"] else "png"
+
+    @staticmethod
+    def cleaned_name(src_path, export_format):
+        orig_name = os.path.splitext(os.path.basename(src_path))[0]
+        return f"{orig_name}_cleaned.{PageIO.export_ext(export_format)}"
+
+    @staticmethod
+    def encode(cv_img, ext):
+        """Converts RGB(A) back to BGR(A) and encodes it into an in-memory buffer"""
+        if len(cv_img.shape) == 3 and cv_img.shape[2] == 4:
+            out_bgr = cv2.cvtColor(cv_img, cv2.COLOR_RGBA2BGRA)
+            if ext.lower() in ['jpg', 'jpeg']:
+                out_bgr = cv2.cvtColor(out_bgr, cv2.COLOR_BGRA2BGR)
+        else:
+            out_bgr = cv2.cvtColor(cv_img, cv2.COLOR_RGB2BGR)
+
+        is_success, buf = cv2.imencode(f".{ext.lstrip('.')}", out_bgr)
+        return buf if is_success else None
+
+    @staticmethod
+    def save(cv_img, save_path):
+        ext = os.path.splitext(save_path)[1]
+        buf = PageIO.encode(cv_img, ext.lstrip('.'))
+        if buf is None:
+            logger.error(f"Failed to encode image: {save_path}")
+            return False
+        buf.tofile(save_path)
+        return True
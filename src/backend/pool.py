@@ -0,0 +1,159 @@
+import os
+import itertools
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.backend.processor import ImageProcessor
+from src.backend.shm_transport import attach, share_tracker
+from src.utils.config import Config
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#   MULTI-PROCESS INFERENCE POOL  #
+#/////////////////////////////////#
+
+# Worker processes stay alive so their models stay in RAM / VRAM
+_pool = None
+_pool_size = 0
+_barrier = None
+_pool_lock = threading.Lock()
+
+# One long-lived progress channel shared by every worker, routed by task id
+_progress_queue = None
+_progress_listeners = {}
+_task_ids = itertools.count(1)
+
+def resolve_worker_count(requested=None):
+    """Config.INFERENCE_WORKERS = 0 picks 1 process on GPU and ~8 cores per process on CPU"""
+    requested = Config.INFERENCE_WORKERS if requested is None else requested
+    if requested > 0: return requested
+
+    import onnxruntime as ort
+    if 'CUDAExecutionProvider' in ort.get_available_providers(): return 1
+    return max(1, min(Config.MAX_AUTO_WORKERS, (os.cpu_count() or 1) // 8))
+
+def get_pool(workers=None):
+    global _pool, _pool_size, _barrier, _progress_queue
+    with _pool_lock:
+        if _pool is None:
+            _pool_size = resolve_worker_count(workers)
+            threads = max(1, (os.cpu_count() or 1) // _pool_size)
+            # Every worker keeps its own sessions, so the model cache budget is split between them
+            from src.backend.ai_manager import AIManager
+            budget = AIManager.get_memory_budget() // _pool_size
+            share_tracker()
+            _barrier = multiprocessing.Barrier(_pool_size)
+            _progress_queue = multiprocessing.Queue()
+            threading.Thread(target=_dispatch_progress, args=(_progress_queue,), daemon=True).start()
+            logger.info(f"[+] Initializing ProcessPoolExecutor: {_pool_size} AI workers x {threads} threads, {budget}MB models each.")
+            _pool = ProcessPoolExecutor(max_workers=_pool_size, initializer=_init_worker,
+                                        initargs=(threads, budget, AIManager._quality, _barrier, _progress_queue))
+        return _pool
+
+def new_task_id(progress_callback=None):
+    """Reserves a task id; progress reported by the worker for it goes to progress_callback"""
+    task_id = next(_task_ids)
+    if progress_callback: _progress_listeners[task_id] = progress_callback
+    return task_id
+
+def end_task(task_id):
+    _progress_listeners.pop(task_id, None)
+
+def _dispatch_progress(q):
+    # Blocks on the pipe instead of polling; a None message stops the listener
+    while True:
+        msg = q.get()
+        if msg is None: return
+        task_id, value = msg
+        callback = _progress_listeners.get(task_id)
+        if callback:
+            try: callback(value)
+            except Exception: pass  # The task's receiver is already gone
+
+def get_pool_size():
+    get_pool()
+    return _pool_size
+
+def broadcast(fn, *args):
+    """Runs fn once in EVERY worker process and returns the futures"""
+    pool = get_pool()
+    # A worker that was busy past the barrier timeout breaks it, so re-arm it first
+    _barrier.reset()
+    return [pool.submit(_run_broadcast, fn, args) for _ in range(_pool_size)]
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _progress_queue.put(None)
+            _pool = None
+
+#/////////////////////////////////#
+#  TOP-LEVEL WORKER ENTRY POINTS  #
+#/////////////////////////////////#
+
+# Top-level functions so Windows can send them to the background processes
+_worker_barrier = None
+_worker_progress = None
+
+def _init_worker(threads, budget, quality, barrier, progress_queue):
+    global _worker_barrier, _worker_progress
+    from src.backend.ai_manager import AIManager
+    AIManager.set_thread_count(threads)
+    AIManager.set_memory_budget(budget)
+    AIManager.set_model_quality(quality)
+    _worker_barrier = barrier
+    _worker_progress = progress_queue
+
+def _run_broadcast(fn, args):
+    # Holding every worker at the barrier guarantees each process takes exactly one call
+    try:
+        _worker_barrier.wait(timeout=60)
+    except threading.BrokenBarrierError:
+        pass
+    return fn(*args)
+
+def _run_ocr_shared(img_h, out_h, language):
+    img_shm, cv_img = attach(img_h)
+    out_shm, out = attach(out_h)
+    try:
+        np.copyto(out, ImageProcessor.run_ocr_logic(cv_img, language))
+    finally:
+        # Views must be dropped before the mappings can close
+        del cv_img, out
+        img_shm.close()
+        out_shm.close()
+
+def _run_clean_shared(img_h, mask_h, out_h, max_tile_w, task_id=None):
+    """Writes the cleaned page into out_h and returns only the undo rects (x, y, w, h)"""
+    def cb(prog):
+        _worker_progress.put((task_id, prog))
+    img_shm, cv_img = attach(img_h)
+    mask_shm, mask_img = attach(mask_h)
+    out_shm, out = attach(out_h)
+    result = None
+    try:
+        result, history = ImageProcessor.run_clean_logic(cv_img, mask_img, max_tile_w, progress_callback=cb if task_id else None)
+        np.copyto(out, result)
+        return [(x, y, p.shape[1], p.shape[0]) for x, y, p in history]
+    finally:
+        del cv_img, mask_img, out, result
+        img_shm.close()
+        mask_shm.close()
+        out_shm.close()
+
+def clean_patches(cv_img, rects):
+    """Rebuilds undo patches from the task's own input copy instead of pickling them back"""
+    return [(x, y, cv_img[y:y+h, x:x+w].copy()) for x, y, w, h in rects]
+
+def _run_warmup(names):
+    """Loads the named sessions into the worker's model cache ahead of the first page"""
+    from src.backend.ai_manager import AIManager
+    loaders = {"ocr": AIManager.get_ocr, "lama": AIManager.get_lama}
+    return all(loaders[n]() is not None for n in names)
+
+def _run_cache_stats():
+    from src.backend.result_cache import ResultCache
+    return ResultCache.stats()
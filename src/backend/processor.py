@@ -1,6 +1,11 @@
 import cv2
 import numpy as np
 from src.backend.ai_manager import AIManager
+from src.backend.region_analyzer import RegionAnalyzer
+from src.backend.result_cache import ResultCache
+from src.backend.tensor_buffers import TensorBuffers
+from src.backend.tile_planner import TilePlanner
+from src.utils.config import Config
 from src.utils.logger import logger
 
 #/////////////////////////////////#
@@ -20,96 +25,262 @@ class ImageProcessor:
             cv_img_rgb = cv_img
 
         h, w = cv_img_rgb.shape[:2]
-        ph, pw = ((h + 31) // 32 * 32), ((w + 31) // 32 * 32)
-        pad_h, pad_w = ph - h, pw - w
-        
-        padded = cv2.copyMakeBorder(cv_img_rgb, 0, pad_h, 0, pad_w, cv2.BORDER_CONSTANT, value=[0,0,0])
-        img_data = padded.astype(np.float32) / 255.0
-        img_data = np.transpose(img_data, (2, 0, 1))[np.newaxis, :]
+        k_size = max(11, int(w * 0.04)) 
+        if k_size % 2 == 0: k_size += 1
 
-        outputs = engine.run(img_data)
-        heatmap = outputs[0][0][0]
-        heatmap = heatmap[0:h, 0:w]
-        
-        mask = (heatmap > 0.3).astype(np.uint8) * 255
+        # Two dilations by a k_size ellipse grow the text by about one disk of twice its radius
+        radius = 2 * (k_size // 2)
+        key = ResultCache.key("ocr", engine.model_id, (language, 0.3, "edt", radius, Config.OCR_WINDOW, Config.OCR_WINDOW_OVERLAP, Config.OCR_TILE_ASPECT), cv_img_rgb)
+        mask = ResultCache.get(key)
+        if mask is not None:
+            logger.info("[+] OCR Mask Ready: served from result cache")
+            return mask
+
+        if max(h, w) > Config.OCR_WINDOW and max(h, w) > Config.OCR_TILE_ASPECT * min(h, w):
+            mask = ImageProcessor._ocr_tiled_mask(engine, cv_img_rgb)
+        else:
+            mask = (ImageProcessor._ocr_heatmap(engine, cv_img_rgb) > 0.3).astype(np.uint8) * 255
         
         #/////////////////////////////////#
         #     4% DYNAMIC MASK DILATION    #
         #/////////////////////////////////#
-        k_size = max(11, int(w * 0.04)) 
-        if k_size % 2 == 0: k_size += 1
-        
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (k_size, k_size))
-        mask = cv2.dilate(mask, kernel, iterations=2)
-        
+        mask = ImageProcessor._expand_mask(mask, radius)
+
+        ResultCache.put(key, mask)
         logger.info(f"[+] OCR Mask Ready: {k_size}px (3% expansion)")
         return mask
 
+    @staticmethod
+    def _ocr_heatmap(engine, rgb):
+        h, w = rgb.shape[:2]
+        outputs = engine.run(ImageProcessor._ocr_input(rgb))
+        return outputs[0][0][0][0:h, 0:w]
+
+    @staticmethod
+    def _ocr_input(rgb):
+        """Zero-padded NCHW float input, built inside a reused buffer (valid until the next window)"""
+        h, w = rgb.shape[:2]
+        ph, pw = ((h + 31) // 32 * 32), ((w + 31) // 32 * 32)
+
+        inp = TensorBuffers.get("ocr_image", (1, 3, ph, pw))
+        inp[:, :, h:, :] = 0
+        inp[:, :, :h, w:] = 0
+        np.copyto(inp[0, :, :h, :w], rgb.transpose(2, 0, 1))
+        np.divide(inp[:, :, :h, :w], 255.0, out=inp[:, :, :h, :w])
+        return inp
+
+    @staticmethod
+    def _ocr_tiled_mask(engine, rgb):
+        """
+        Slides overlapping windows along the long axis (webtoon strips) and
+        cross-fades their heatmaps in the overlaps. Only one window and the
+        pending overlap are held as float, so peak memory follows the window.
+        """
+        axis = 0 if rgb.shape[0] >= rgb.shape[1] else 1
+        length = rgb.shape[axis]
+        win = Config.OCR_WINDOW // 32 * 32
+        step = max(32, win - Config.OCR_WINDOW_OVERLAP)
+        starts = list(range(0, length - win, step)) + [length - win]
+
+        def along(a, b):
+            return (slice(a, b), slice(None)) if axis == 0 else (slice(None), slice(a, b))
+
+        mask = np.zeros(rgb.shape[:2], dtype=np.uint8)
+        carry, carry_start = None, 0
+        for i, start in enumerate(starts):
+            heat = ImageProcessor._ocr_heatmap(engine, np.ascontiguousarray(rgb[along(start, start + win)]))
+
+            if carry is not None:
+                # Linear ramp from the previous window to this one across the shared rows / columns
+                n = carry.shape[axis]
+                ramp = np.linspace(0.0, 1.0, n + 2, dtype=np.float32)[1:-1]
+                ramp = ramp[:, None] if axis == 0 else ramp[None, :]
+                head = heat[along(0, n)]
+                head[...] = carry * (1.0 - ramp) + head * ramp
+
+            # Everything before the next window is final; keep its overlap for blending
+            end = starts[i + 1] - start if i + 1 < len(starts) else win
+            mask[along(start, start + end)] = (heat[along(0, end)] > 0.3) * np.uint8(255)
+            carry = heat[along(end, win)].copy() if end < win else None
+
+        logger.info(f"[i] Tiled OCR: {len(starts)} windows of {win}px along {'height' if axis == 0 else 'width'}")
+        return mask
+
+    @staticmethod
+    def _expand_mask(mask, radius):
+        """
+        Grows a 0/255 mask by `radius` px, like a dilation with a disk of that
+        radius. A Euclidean distance transform costs the same per pixel at any
+        radius, where cv2.dilate slows down with the kernel size. The page is
+        done in bands of rows with a radius-wide apron, so the float32
+        distance map stays small on long strips and the result is unchanged.
+        """
+        h = mask.shape[0]
+        band = Config.MASK_EXPAND_BAND
+        out = np.empty_like(mask)
+        for y in range(0, h, band):
+            a, b = max(0, y - radius), min(h, y + band + radius)
+            dist = cv2.distanceTransform(cv2.bitwise_not(mask[a:b]), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+            n = min(band, h - y)
+            np.less_equal(dist[y - a:y - a + n], radius, out=out[y:y + n], casting="unsafe")
+        out *= 255
+        return out
+
+    @staticmethod
+    def run_transparency_logic(cv_img):
+        if cv_img is not None and len(cv_img.shape) == 3 and cv_img.shape[2] == 4:
+            # Grab EVERYTHING that isn't 100% solid opaque (catches the soft fringes)
+            mask = (cv_img[:, :, 3] < 255).astype(np.uint8) * 255
+            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+            return cv2.dilate(mask, kernel, iterations=1)
+
+        h, w = cv_img.shape[:2] if cv_img is not None else (100, 100)
+        return np.zeros((h, w), dtype=np.uint8)
+
     @staticmethod
     def run_clean_logic(cv_img, mask_img, max_tile_size, progress_callback=None):
         engine = AIManager.get_lama()
         if not engine: return cv_img, []
 
-        h, w = cv_img.shape[:2]
-        output = cv_img.copy().astype(np.float32)
+        # Tiles come back as uint8, so the page never needs a float copy
+        output = cv_img.copy()
         history = []
 
-        _, labels, stats, _ = cv2.connectedComponentsWithStats(mask_img, connectivity=8)
-        blobs = [stats[i] for i in range(1, len(stats)) if stats[i, 4] > 5]
-        
-        total = len(blobs)
-        processed_mask = np.zeros_like(mask_img)
-        
-        for idx, blob in enumerate(sorted(blobs, key=lambda x: x[4], reverse=True)):
-            bx, by, bw, bh, _ = blob
-            if np.all(processed_mask[by:by+bh, bx:bx+bw] == 255): continue
-
-            cx, cy = bx + bw//2, by + bh//2
-            x1 = max(0, cx - max_tile_size//2)
-            y1 = max(0, cy - max_tile_size//2)
-            x2 = min(w, x1 + max_tile_size)
-            y2 = min(h, y1 + max_tile_size)
-            x1 = max(0, x2 - max_tile_size)
-            y1 = max(0, y2 - max_tile_size)
-
-            tile_img = cv_img[y1:y2, x1:x2]
-            tile_mask = mask_img[y1:y2, x1:x2]
-            th, tw = tile_img.shape[:2]
+        regions, region_stats = RegionAnalyzer.analyze(mask_img, cv_img)
+        logger.info(f"[+] Regions: {region_stats['components']} components -> {region_stats['regions']} regions "
+                    f"({region_stats['bubbles']} bubbles, {region_stats['noise']} noise specks dropped)")
 
+        tiles = TilePlanner.plan(mask_img, max_tile_size, regions)
+        total = len(tiles)
+        results = [None] * total
+
+        stats = TilePlanner.report(tiles, mask_img.shape)
+        logger.info(f"[+] Tile plan: {stats['tiles']} tiles for {stats['boxes']} region boxes | "
+                    f"{stats['pixels'] / 1e6:.2f} MP inferred ({stats['coverage']:.0%} of page)")
+
+        # Tiles whose pixels and mask were inpainted before skip inference entirely
+        keys = []
+        for idx, (x1, y1, x2, y2) in enumerate(t["rect"] for t in tiles):
+            keys.append(ResultCache.key("lama", engine.model_id, "", cv_img[y1:y2, x1:x2, :3], mask_img[y1:y2, x1:x2]))
+            results[idx] = ResultCache.get(keys[idx])
+        cached = sum(r is not None for r in results)
+        if cached:
+            logger.info(f"[i] Result cache: {cached}/{total} tiles reused")
+
+        #/////////////////////////////////#
+        #   SAME-SHAPE MULTI-TILE BATCHES #
+        #/////////////////////////////////#
+        groups = {}
+        for idx, (x1, y1, x2, y2) in enumerate(t["rect"] for t in tiles):
+            if results[idx] is not None: continue
+            shape = ((y2 - y1 + 7) // 8 * 8, (x2 - x1 + 7) // 8 * 8)
+            groups.setdefault(shape, []).append(idx)
+
+        # Progress follows inferred pixels, so one big bubble tile outweighs a stray speck
+        cost = [(x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in (t["rect"] for t in tiles)]
+        total_cost = max(1, sum(cost))
+        done = sum(c for c, r in zip(cost, results) if r is not None)
+        for (ph, pw), indices in groups.items():
+            limit = ImageProcessor._batch_limit(engine, ph, pw)
+            start = 0
+            while start < len(indices):
+                chunk = indices[start:start + limit]
+                try:
+                    batch = ImageProcessor._infer_tiles(engine, cv_img, mask_img, [tiles[i]["rect"] for i in chunk])
+                except Exception as e:
+                    # Single tiles are what ran before batching existed; only a stacked batch gets a second try
+                    if limit == 1: raise
+                    logger.warning(f"Batch of {len(chunk)} {pw}x{ph} tiles failed, retrying one at a time: {e}")
+                    limit = 1
+                    continue
+                for idx, res in zip(chunk, batch):
+                    results[idx] = res
+                    ResultCache.put(keys[idx], res)
+                start += len(chunk)
+                done += sum(cost[i] for i in chunk)
+                if progress_callback: progress_callback(int((done/total_cost)*100))
+
+        # Each tile only pastes the masked pixels of the regions it owns, so overlaps never overwrite
+        is_rgba = len(output.shape) == 3 and output.shape[2] == 4
+        for tile, res in zip(tiles, results):
+            tx1, ty1 = tile["rect"][:2]
+            boxes = tile["boxes"]
+            ux1, uy1 = min(b[0] for b in boxes), min(b[1] for b in boxes)
+            ux2, uy2 = max(b[2] for b in boxes), max(b[3] for b in boxes)
+            history.append((ux1, uy1, output[uy1:uy2, ux1:ux2].copy()))
+
+            for x1, y1, x2, y2 in boxes:
+                sel = mask_img[y1:y2, x1:x2] > 127
+                patch = res[y1-ty1:y2-ty1, x1-tx1:x2-tx1]
+                # Apply generated pixels and restore Alpha opacity (set alpha = 255)
+                if is_rgba:
+                    output[y1:y2, x1:x2, :3][sel] = patch[sel]
+                    output[y1:y2, x1:x2, 3][sel] = 255
+                else:
+                    output[y1:y2, x1:x2][sel] = patch[sel]
+
+        return output, history
+
+    @staticmethod
+    def _batch_limit(engine, ph, pw):
+        """How many (ph, pw) tiles fit in one session.run under the batch memory budget"""
+        if not engine.dynamic_batch: return 1
+        # The network's intermediate activations dwarf the float32 image + mask in and image out
+        tile_bytes = ph * pw * (Config.LAMA_ACTIVATION_BYTES_PER_PX + (3 + 1 + 3) * 4)
+        if engine.device == "GPU":
+            cap, budget_mb = Config.LAMA_MAX_BATCH_GPU, Config.LAMA_BATCH_BUDGET_MB_GPU
+        else:
+            cap, budget_mb = Config.LAMA_MAX_BATCH, Config.LAMA_BATCH_BUDGET_MB
+        return max(1, min(cap, budget_mb * 1024 * 1024 // tile_bytes))
+
+    @staticmethod
+    def _infer_tiles(engine, cv_img, mask_img, rects):
+        """Runs LaMa on tiles sharing one padded shape as a single NCHW batch"""
+        feeds = ImageProcessor._tile_inputs(cv_img, mask_img, rects)
+        batch = engine.run_into(feeds, TensorBuffers.get("lama_output", feeds["image"].shape))
+
+        results = []
+        for (x1, y1, x2, y2), res in zip(rects, batch):
+            # Scaled and clipped in place, then only the unpadded pixels are cast out as HWC uint8
+            res = res[:, 0:y2-y1, 0:x2-x1]
+            np.multiply(res, 255, out=res)
+            np.clip(res, 0, 255, out=res)
+            tile = np.empty((y2 - y1, x2 - x1, 3), dtype=np.uint8)
+            np.copyto(tile, res.transpose(1, 2, 0), casting="unsafe")
+            results.append(tile)
+        return results
+
+    @staticmethod
+    def _tile_inputs(cv_img, mask_img, rects):
+        """
+        LaMa feed dict for tiles of one padded shape. Tiles are padded in
+        reused uint8 staging buffers and written straight into reused NCHW
+        float buffers, which stay valid until the next batch of that shape.
+        """
+        x1, y1, x2, y2 = rects[0]
+        #/////////////////////////////////#
+        #     SNAP-TO-8 PADDING LOGIC     #
+        #/////////////////////////////////#
+        ph, pw = ((y2 - y1 + 7) // 8 * 8), ((x2 - x1 + 7) // 8 * 8)
+        n = len(rects)
+
+        inp_img = TensorBuffers.get("lama_image", (n, 3, ph, pw))
+        inp_mask = TensorBuffers.get("lama_mask", (n, 1, ph, pw))
+        stage_img = TensorBuffers.get("lama_stage_image", (ph, pw, 3), np.uint8)
+        stage_mask = TensorBuffers.get("lama_stage_mask", (ph, pw), np.uint8)
+
+        for i, (x1, y1, x2, y2) in enumerate(rects):
             # Strip Alpha for AI inference to prevent ONNX crash
-            if len(tile_img.shape) == 3 and tile_img.shape[2] == 4:
-                tile_img_rgb = tile_img[:, :, :3]
-            else:
-                tile_img_rgb = tile_img
-
-            #/////////////////////////////////#
-            #     SNAP-TO-8 PADDING LOGIC     #
-            #/////////////////////////////////#
-            ph, pw = ((th + 7) // 8 * 8), ((tw + 7) // 8 * 8)
-            pad_h, pad_w = ph - th, pw - tw
-            
-            inp_img = cv2.copyMakeBorder(tile_img_rgb, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT)
-            inp_img = inp_img.astype(np.float32) / 255.0
-            inp_img = np.transpose(inp_img, (2, 0, 1))[np.newaxis, :]
-            
-            inp_mask = cv2.copyMakeBorder(tile_mask, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT)
-            inp_mask = (inp_mask > 127).astype(np.float32)[np.newaxis, np.newaxis, :]
-
-            res = engine.run({'image': inp_img, 'mask': inp_mask})[0][0]
-            res = np.clip(np.transpose(res, (1, 2, 0)) * 255, 0, 255).astype(np.uint8)
-            res = res[0:th, 0:tw]
-
-            history.append((x1, y1, output[y1:y2, x1:x2].copy().astype(np.uint8)))
-
-            # Apply generated pixels and restore Alpha opacity (set alpha = 255)
-            if len(output.shape) == 3 and output.shape[2] == 4:
-                output[y1:y2, x1:x2, :3] = res.astype(np.float32)
-                output[y1:y2, x1:x2, 3] = 255
-            else:
-                output[y1:y2, x1:x2] = res.astype(np.float32)
-
-            processed_mask[y1:y2, x1:x2] = 255
-
-            if progress_callback: progress_callback(int((idx/total)*100))
-
-        return output.astype(np.uint8), history
+            tile_img = cv_img[y1:y2, x1:x2, :3]
+            tile_mask = mask_img[y1:y2, x1:x2]
+            pad_h, pad_w = ph - (y2 - y1), pw - (x2 - x1)
+
+            cv2.copyMakeBorder(tile_img, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT, dst=stage_img)
+            np.copyto(inp_img[i], stage_img.transpose(2, 0, 1))
+
+            cv2.copyMakeBorder(tile_mask, 0, pad_h, 0, pad_w, cv2.BORDER_REFLECT, dst=stage_mask)
+            cv2.threshold(stage_mask, 127, 1, cv2.THRESH_BINARY, dst=stage_mask)
+            np.copyto(inp_mask[i, 0], stage_mask)
+
+        np.divide(inp_img, 255.0, out=inp_img)
+        return {'image': inp_img, 'mask': inp_mask}
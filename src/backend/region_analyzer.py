@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+from src.utils.config import Config
+
+#/////////////////////////////////#
+#   TEXT REGION / BUBBLE GROUPING #
+#/////////////////////////////////#
+
+class RegionAnalyzer:
+    """
+    Turns the mask's connected components into a short list of text regions
+    before any tile is planned. Components whose boxes lie within
+    Config.REGION_GAP of each other, or that sit in the same speech bubble,
+    become one region. Specks that stay isolated are dropped as noise.
+    """
+
+    @staticmethod
+    def analyze(mask_img, cv_img=None):
+        """
+        Returns [{"box": (x1, y1, x2, y2), "area", "components", "bubble", "priority"}]
+        sorted by priority (highest first), plus a stats dict for logging.
+        Bubbles are only looked for when the page image is given.
+        """
+        _, labels, stats, _ = cv2.connectedComponentsWithStats(mask_img, connectivity=8)
+        comps = stats[1:]
+        if len(comps) == 0:
+            return [], {"components": 0, "regions": 0, "bubbles": 0, "noise": 0}
+
+        boxes = np.stack([comps[:, 0], comps[:, 1], comps[:, 0] + comps[:, 2], comps[:, 1] + comps[:, 3]], axis=1)
+        bubbles = RegionAnalyzer._bubbles(labels, boxes, cv_img) if cv_img is not None else np.zeros(len(comps), dtype=np.int64)
+
+        parent = list(range(len(comps)))
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in RegionAnalyzer._near_pairs(boxes):
+            parent[find(i)] = find(j)
+        first = {}
+        for i, b in enumerate(bubbles):
+            if b == 0: continue
+            if b in first: parent[find(i)] = find(first[b])
+            else: first[b] = i
+
+        # A cluster's box can reach over components that are near none of its members;
+        # overlapping boxes are fused too, so every masked pixel lies in exactly one region box
+        while True:
+            clusters = {}
+            for i in range(len(comps)):
+                clusters.setdefault(find(i), []).append(i)
+            roots = list(clusters)
+            cb = np.array([[boxes[m, 0].min(), boxes[m, 1].min(), boxes[m, 2].max(), boxes[m, 3].max()]
+                           for m in clusters.values()])
+            pairs = RegionAnalyzer._near_pairs(cb, gap=-1)
+            if not pairs: break
+            for i, j in pairs:
+                parent[find(roots[i])] = find(roots[j])
+
+        regions, noise = [], 0
+        for members in clusters.values():
+            area = int(comps[members, 4].sum())
+            if area <= Config.REGION_NOISE_AREA:
+                noise += len(members)
+                continue
+            b = boxes[members]
+            bubble = int(bubbles[members].max())
+            regions.append({
+                "box": (int(b[:, 0].min()), int(b[:, 1].min()), int(b[:, 2].max()), int(b[:, 3].max())),
+                "area": area,
+                "components": len(members),
+                "bubble": bubble,
+                # Big regions first; the rest of the page depends least on the small leftovers
+                "priority": area,
+            })
+
+        regions.sort(key=lambda r: r["priority"], reverse=True)
+        return regions, {"components": len(comps), "regions": len(regions),
+                         "bubbles": len({r["bubble"] for r in regions if r["bubble"]}), "noise": noise}
+
+    @staticmethod
+    def _near_pairs(boxes, gap=None):
+        """Index pairs (i < j) whose boxes are at most gap (default Config.REGION_GAP) apart; rows are done in blocks to bound memory"""
+        if gap is None: gap = Config.REGION_GAP
+        pairs = []
+        for start in range(0, len(boxes), 1024):
+            a = boxes[start:start + 1024, None, :]
+            b = boxes[None, :, :]
+            dx = np.maximum(b[..., 0] - a[..., 2], a[..., 0] - b[..., 2])
+            dy = np.maximum(b[..., 1] - a[..., 3], a[..., 1] - b[..., 3])
+            ii, jj = np.nonzero((np.maximum(dx, dy) <= gap))
+            ii += start
+            keep = ii < jj
+            pairs.extend(zip(ii[keep].tolist(), jj[keep].tolist()))
+        return pairs
+
+    @staticmethod
+    def _bubbles(labels, boxes, cv_img):
+        """
+        Bubble id per component (0 = none). Bubbles are the bright enclosed
+        areas of a subsampled copy of the page; a component belongs to the one
+        its pixels mostly touch, if that area is bubble-sized and encloses it.
+        """
+        s = Config.BUBBLE_SCALE
+        small = np.ascontiguousarray(cv_img[::s, ::s, :3])
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        bright = (gray >= Config.BUBBLE_MIN_BRIGHTNESS).astype(np.uint8)
+        n, bub_labels, bub_stats, _ = cv2.connectedComponentsWithStats(bright, connectivity=4)
+
+        comp = labels[::s, ::s]
+        sel = (comp > 0) & (bub_labels > 0)
+        codes = comp[sel].astype(np.int64) * n + bub_labels[sel]
+        codes, counts = np.unique(codes, return_counts=True)
+
+        # Most-touched bright area per component: sort by count, later writes win
+        best = np.zeros(len(boxes) + 1, dtype=np.int64)
+        order = np.argsort(counts)
+        best[codes[order] // n] = codes[order] % n
+        best = best[1:]
+
+        page_px = bright.shape[0] * bright.shape[1]
+        tol = Config.REGION_GAP
+        result = np.zeros(len(boxes), dtype=np.int64)
+        for i, b in enumerate(best):
+            if b == 0: continue
+            bx, by, bw, bh, area = bub_stats[b]
+            if area > Config.BUBBLE_MAX_SHARE * page_px: continue  # Page background / gutters, not a bubble
+            x1, y1, x2, y2 = boxes[i]
+            if x1 + tol >= bx * s and y1 + tol >= by * s and x2 - tol <= (bx + bw) * s and y2 - tol <= (by + bh) * s:
+                result[i] = b
+        return result
@@ -0,0 +1,126 @@
+import os
+import hashlib
+import threading
+import cv2
+import numpy as np
+from src.utils.config import Config
+from src.utils.paths import Paths
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#  CONTENT-ADDRESSED RESULT CACHE #
+#/////////////////////////////////#
+
+class ResultCache:
+    """
+    Inference results on disk, keyed by a hash of the input pixels, the model
+    file and every parameter that changes the output. Unchanged pages and
+    tiles come back without touching ONNX Runtime, across re-batches, errors
+    and reopened folders. Entries are lossless PNGs; the oldest-used ones are
+    deleted once the folder grows past Config.RESULT_CACHE_MB.
+    """
+    _lock = threading.Lock()
+    _size = None  # Bytes on disk as last seen by this process
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def key(kind, model_id, params, *arrays):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{kind}|{model_id}|{params}".encode())
+        for a in arrays:
+            digest.update(f"{a.shape}{a.dtype}".encode())
+            digest.update(np.ascontiguousarray(a).data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def get(key):
+        if not Config.RESULT_CACHE_ENABLED: return None
+        path = ResultCache._path(key)
+        try:
+            result = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            os.utime(path)  # mtime doubles as the LRU clock
+        except (FileNotFoundError, OSError):
+            result = None
+
+        with ResultCache._lock:
+            if result is None: ResultCache.misses += 1
+            else: ResultCache.hits += 1
+        return result
+
+    @staticmethod
+    def put(key, result):
+        if not Config.RESULT_CACHE_ENABLED: return
+        path = ResultCache._path(key)
+        ok, buf = cv2.imencode(".png", result, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if not ok: return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Pool workers share the folder; a rename never exposes a half-written entry
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            buf.tofile(tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Result cache write failed: {e}")
+            return
+
+        with ResultCache._lock:
+            if ResultCache._size is None: ResultCache._size = ResultCache._scan_size()
+            ResultCache._size += buf.nbytes
+            if ResultCache._size > Config.RESULT_CACHE_MB * 1024 * 1024:
+                ResultCache._evict()
+
+    @staticmethod
+    def stats():
+        total = ResultCache.hits + ResultCache.misses
+        return {"hits": ResultCache.hits, "misses": ResultCache.misses,
+                "hit_rate": ResultCache.hits / total if total else 0.0}
+
+    @staticmethod
+    def clear():
+        removed = 0
+        with ResultCache._lock:
+            for path, _, _ in ResultCache._entries():
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError: pass
+            ResultCache._size = 0
+        logger.info(f"[i] Result cache cleared: {removed} entries removed")
+
+    @staticmethod
+    def _evict():
+        # Rescanned from disk so entries written by the other worker processes count too
+        entries = sorted(ResultCache._entries(), key=lambda e: e[1])
+        total = sum(e[2] for e in entries)
+        target = Config.RESULT_CACHE_MB * 1024 * 1024 * 0.9
+        removed = 0
+        for path, _, size in entries:
+            if total <= target: break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            total -= size
+        ResultCache._size = total
+        logger.info(f"[i] Result cache trimmed: {removed} entries evicted, {total / (1024 * 1024):.0f}MB kept")
+
+    @staticmethod
+    def _entries():
+        if not os.path.isdir(Paths.RESULT_CACHE): return
+        for sub in os.scandir(Paths.RESULT_CACHE):
+            if not sub.is_dir(): continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith(".png"):
+                    st = f.stat()
+                    yield f.path, st.st_mtime, st.st_size
+
+    @staticmethod
+    def _scan_size():
+        return sum(e[2] for e in ResultCache._entries())
+
+    @staticmethod
+    def _path(key):
+        # Two-level fan-out keeps directories small on big chapters
+        return os.path.join(Paths.RESULT_CACHE, key[:2], key + ".png")
@@ -0,0 +1,90 @@
+import os
+import atexit
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#   SHARED-MEMORY IMAGE TRANSPORT #
+#/////////////////////////////////#
+
+class SharedArena:
+    """
+    Owns the shared-memory segments of one AI task. Only small handles
+    ({"name", "shape", "dtype"}) cross the process boundary; the worker maps
+    the same pages and writes its result in place, so images are never pickled.
+    """
+    _live = set()
+    _live_lock = threading.Lock()
+
+    def __init__(self):
+        self.segments = {}
+        with SharedArena._live_lock:
+            SharedArena._live.add(self)
+
+    def alloc(self, shape, dtype):
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self.segments[shm.name] = shm
+        return {"name": shm.name, "shape": tuple(shape), "dtype": dtype.str}
+
+    def put(self, array):
+        handle = self.alloc(array.shape, array.dtype)
+        np.copyto(self.view(handle), array)
+        return handle
+
+    def view(self, handle):
+        shm = self.segments[handle["name"]]
+        return np.ndarray(handle["shape"], dtype=np.dtype(handle["dtype"]), buffer=shm.buf)
+
+    def release(self):
+        for shm in self.segments.values():
+            try:
+                shm.close()
+            except BufferError:
+                # A numpy view is still alive; the mapping goes away with it
+                pass
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments.clear()
+        with SharedArena._live_lock:
+            SharedArena._live.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    @staticmethod
+    def release_all():
+        """Frees every segment still owned by this process (app shutdown)"""
+        with SharedArena._live_lock:
+            arenas = list(SharedArena._live)
+        if arenas:
+            logger.info(f"[i] Releasing {len(arenas)} shared-memory arenas.")
+        for arena in arenas:
+            arena.release()
+
+atexit.register(SharedArena.release_all)
+
+#/////////////////////////////////#
+#      WORKER-SIDE ATTACHMENT     #
+#/////////////////////////////////#
+
+def share_tracker():
+    """Starts the resource tracker BEFORE the pool forks so every worker inherits it"""
+    if os.name != "nt":
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+
+def attach(handle):
+    """Maps a segment created by the GUI / CLI process. Returns (shm, ndarray)"""
+    # Pool workers share the creator's resource tracker (see share_tracker), so attaching
+    # re-registers the same name and must NOT unregister it before the creator's own unlink
+    shm = shared_memory.SharedMemory(name=handle["name"])
+    return shm, np.ndarray(handle["shape"], dtype=np.dtype(handle["dtype"]), buffer=shm.buf)
@@ -0,0 +1,37 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.utils.config import Config
+
+#/////////////////////////////////#
+#   REUSABLE INFERENCE BUFFERS    #
+#/////////////////////////////////#
+
+class TensorBuffers:
+    """
+    Per-thread scratch arrays for model inputs and outputs, keyed by a name
+    and their shape past the batch axis. A request for n items reuses any
+    buffer with room for n and returns a contiguous [:n] view, so same-shape
+    tiles and OCR windows stop allocating fresh float32 tensors on every run.
+    The least recently used shapes are dropped past Config.TENSOR_BUFFER_SLOTS.
+    Views are only valid until the next request for the same name and shape.
+    """
+    _local = threading.local()
+
+    @staticmethod
+    def get(name, shape, dtype=np.float32):
+        slots = TensorBuffers._slots()
+        key = (name, tuple(shape[1:]), np.dtype(dtype).str)
+        buf = slots.get(key)
+        if buf is None or buf.shape[0] < shape[0]:
+            buf = slots[key] = np.empty(shape, dtype=dtype)
+        slots.move_to_end(key)
+        while len(slots) > Config.TENSOR_BUFFER_SLOTS:
+            slots.popitem(last=False)
+        return buf[:shape[0]]
+
+    @staticmethod
+    def _slots():
+        if not hasattr(TensorBuffers._local, "slots"):
+            TensorBuffers._local.slots = OrderedDict()
+        return TensorBuffers._local.slots
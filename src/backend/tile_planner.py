@@ -0,0 +1,127 @@
+import numpy as np
+from src.backend.region_analyzer import RegionAnalyzer
+from src.utils.config import Config
+
+#/////////////////////////////////#
+#    ADAPTIVE ROI TILE PLANNER    #
+#/////////////////////////////////#
+
+class TilePlanner:
+    """
+    Sizes every LaMa window to its blob's bounding box plus a context margin
+    (snapped to 8) instead of a fixed max_tile_size square. Nearby blobs share
+    one window, and only blobs that need it fall back to the large tile.
+    """
+
+    @staticmethod
+    def plan(mask_img, max_tile_size, regions=None):
+        """
+        Returns the LaMa jobs as [{"rect": (x1, y1, x2, y2), "boxes": [...]}].
+        Every region box is owned by exactly one tile, so each masked pixel is
+        inpainted and pasted once no matter how the windows overlap. Regions
+        come from RegionAnalyzer (mask-only grouping when none are passed).
+        """
+        h, w = mask_img.shape[:2]
+        if regions is None:
+            regions, _ = RegionAnalyzer.analyze(mask_img)
+
+        boxes = []
+        for r in regions:
+            boxes.extend(TilePlanner._split_box(*r["box"], r["area"], max_tile_size))
+        if not boxes: return []
+
+        # Candidate windows: one per merged group of nearby boxes
+        groups = TilePlanner._merge_groups([list(b) for b in boxes], max_tile_size)
+        windows = np.array([TilePlanner._window(*g[:4], w, h, max_tile_size) for g in groups])
+        return TilePlanner._cover(windows, np.array(boxes))
+
+    @staticmethod
+    def _cover(windows, boxes):
+        """Greedy set cover: keep taking the window that contains the most still-uncovered boxes"""
+        # contains[i, j] -> window i fully encloses box j
+        contains = ((windows[:, None, 0] <= boxes[None, :, 0]) & (windows[:, None, 1] <= boxes[None, :, 1]) &
+                    (windows[:, None, 2] >= boxes[None, :, 2]) & (windows[:, None, 3] >= boxes[None, :, 3]))
+        areas = (windows[:, 2] - windows[:, 0]) * (windows[:, 3] - windows[:, 1])
+        uncovered = np.ones(len(boxes), dtype=bool)
+
+        tiles = []
+        while uncovered.any():
+            gain = (contains & uncovered).sum(axis=1)
+            # Most boxes first, smaller window breaks ties
+            best = int(np.lexsort((areas, -gain))[0])
+            owned = contains[best] & uncovered
+            uncovered &= ~owned
+            tiles.append({
+                "rect": tuple(int(v) for v in windows[best]),
+                "boxes": [tuple(int(v) for v in b[:4]) for b in boxes[owned]],
+            })
+        return tiles
+
+    @staticmethod
+    def report(tiles, shape):
+        """Summarises how much of the page the plan sends through LaMa"""
+        page_px = shape[0] * shape[1]
+        tile_px = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in (t["rect"] for t in tiles))
+        return {
+            "tiles": len(tiles),
+            "boxes": sum(len(t["boxes"]) for t in tiles),
+            "pixels": tile_px,
+            "coverage": tile_px / page_px if page_px else 0.0,
+        }
+
+    @staticmethod
+    def _split_box(x1, y1, x2, y2, area, max_tile_size):
+        """Cuts boxes that cannot fit one tile with context into a grid of pieces that can"""
+        core = max(8, max_tile_size - 2 * Config.TILE_CONTEXT_MARGIN)
+        nx = max(1, -(-(x2 - x1) // core))
+        ny = max(1, -(-(y2 - y1) // core))
+        if nx == 1 and ny == 1: return [(x1, y1, x2, y2, area)]
+
+        xs = np.linspace(x1, x2, nx + 1).astype(int)
+        ys = np.linspace(y1, y2, ny + 1).astype(int)
+        piece_area = area // (nx * ny)
+        return [(xs[i], ys[j], xs[i + 1], ys[j + 1], piece_area) for j in range(ny) for i in range(nx)]
+
+    @staticmethod
+    def _margin(x1, y1, x2, y2):
+        return max(Config.TILE_CONTEXT_MARGIN, max(x2 - x1, y2 - y1) // 4)
+
+    @staticmethod
+    def _snap(size):
+        return max(Config.TILE_MIN_SIZE, (size + 7) // 8 * 8)
+
+    @staticmethod
+    def _merge_groups(groups, max_tile_size):
+        """Repeatedly fuses groups closer than the context margin while the result still fits one tile"""
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(groups)):
+                a = groups[i]
+                for j in range(i + 1, len(groups)):
+                    b = groups[j]
+                    gap = max(b[0] - a[2], a[0] - b[2], b[1] - a[3], a[1] - b[3], 0)
+                    if gap > Config.TILE_MERGE_GAP: continue
+
+                    u = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]), a[4] + b[4]]
+                    margin = TilePlanner._margin(*u[:4])
+                    if max(u[2] - u[0], u[3] - u[1]) + 2 * margin > max_tile_size: continue
+
+                    groups[i] = u
+                    groups.pop(j)
+                    merged = True
+                    break
+                if merged: break
+        return groups
+
+    @staticmethod
+    def _window(x1, y1, x2, y2, w, h, max_tile_size):
+        margin = TilePlanner._margin(x1, y1, x2, y2)
+        # Blobs too big for their margin fall back to the large tile
+        tw = min(TilePlanner._snap(x2 - x1 + 2 * margin), max_tile_size, w)
+        th = min(TilePlanner._snap(y2 - y1 + 2 * margin), max_tile_size, h)
+
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        tx1 = min(max(0, cx - tw // 2), w - tw)
+        ty1 = min(max(0, cy - th // 2), h - th)
+        return tx1, ty1, tx1 + tw, ty1 + th
@@ -1,42 +1,25 @@
-import cv2
-import time
 import numpy as np
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from PySide6.QtCore import QObject, Signal, Slot
+from src.backend.pool import (get_pool, clean_patches, new_task_id, end_task,
+                              _run_ocr_shared, _run_clean_shared)
 from src.backend.processor import ImageProcessor
+from src.backend.shm_transport import SharedArena
 from src.utils.logger import logger
 
-# Keep a single background process alive so models stay in VRAM
-_pool = None
-def get_pool():
-    global _pool
-    if _pool is None:
-        logger.info("[+] Initializing new ProcessPoolExecutor for background AI tasks.")
-        _pool = ProcessPoolExecutor(max_workers=1)
-    return _pool
-
-# Top-level functions so Windows can send them to the background process
-def _run_ocr_process(cv_img, language):
-    return ImageProcessor.run_ocr_logic(cv_img, language)
-
-def _run_clean_process(cv_img, mask_img, max_tile_w, queue):
-    def cb(prog):
-        queue.put(prog)
-    return ImageProcessor.run_clean_logic(cv_img, mask_img, max_tile_w, progress_callback=cb)
-
-def _run_flush_process(persistent):
-    from src.backend.ai_manager import AIManager
-    AIManager.set_persistence(persistent)
-    if not persistent:
-        AIManager.flush()
-    return True
+# Light CPU-only scans run on a local thread instead of a worker process
+_local = ThreadPoolExecutor(max_workers=1)
 
 #/////////////////////////////////#
 #     AI ASYNC TASK WORKER        #
 #/////////////////////////////////#
 
 class AIWorker(QObject):
+    """
+    Submits one task and returns immediately. Completion arrives through a
+    future done-callback and progress through the pool's shared channel;
+    signals emitted from those threads are queued onto the GUI thread.
+    """
     finished = Signal(object, object)
     progress = Signal(int)
     error = Signal(str)
@@ -45,68 +28,62 @@ class AIWorker(QObject):
         super().__init__()
         self.task = task
         self.args = args
-        self.manager = multiprocessing.Manager()
+        self.arena = None
+        self.task_id = None
         logger.info(f"[i] AIWorker initialized for task: {self.task}")
 
     @Slot()
     def process(self):
-        if self.task == "ocr":
-            self.run_ocr(self.args[0], "ENG")
-        elif self.task == "clean":
-            self.run_clean(self.args[0], self.args[1], self.args[2])
-        elif self.task == "transparency":
-            self.run_transparency(self.args[0])
-
-    def run_ocr(self, cv_img, language):
         try:
-            logger.info("[i] Submitting OCR task to background OS process...")
-            future = get_pool().submit(_run_ocr_process, cv_img, language)
-            
-            # Poll the background process without blocking the GUI
-            while not future.done():
-                time.sleep(0.05)
-                
-            logger.info("[+] OCR background task completed successfully.")
-            self.finished.emit(future.result(), None)
+            if self.task == "ocr":
+                future = self.run_ocr(self.args[0], "ENG")
+            elif self.task == "clean":
+                future = self.run_clean(self.args[0], self.args[1], self.args[2])
+            elif self.task == "transparency":
+                logger.info("[i] Executing Transparency scan on a local thread...")
+                future = _local.submit(ImageProcessor.run_transparency_logic, self.args[0])
+            future.add_done_callback(self._on_done)
         except Exception as e:
-            logger.error(f"[X] OCR Task crashed in background process: {e}")
+            self._release()
+            logger.error(f"[X] {self.task} task could not be submitted: {e}")
             self.error.emit(str(e))
 
+    def run_ocr(self, cv_img, language):
+        logger.info("[i] Submitting OCR task to background OS process...")
+        self.arena = SharedArena()
+        img_h = self.arena.put(cv_img)
+        self.out_h = self.arena.alloc(cv_img.shape[:2], np.uint8)
+        return get_pool().submit(_run_ocr_shared, img_h, self.out_h, language)
+
     def run_clean(self, cv_img, mask_img, max_tile_w):
+        logger.info("[i] Submitting LaMa Clean task to background OS process...")
+        self.arena = SharedArena()
+        self.task_id = new_task_id(self.progress.emit)
+        img_h = self.arena.put(cv_img)
+        mask_h = self.arena.put(mask_img)
+        self.out_h = self.arena.alloc(cv_img.shape, np.uint8)
+        return get_pool().submit(_run_clean_shared, img_h, mask_h, self.out_h, max_tile_w, self.task_id)
+
+    def _on_done(self, future):
+        # Runs on the executor's callback thread; the arena is read and freed before Qt sees the result
         try:
-            logger.info("[i] Submitting LaMa Clean task to background OS process...")
-            q = self.manager.Queue()
-            future = get_pool().submit(_run_clean_process, cv_img, mask_img, max_tile_w, q)
-            
-            # Poll the background process and update UI progress
-            while not future.done():
-                while not q.empty():
-                    self.progress.emit(q.get())
-                time.sleep(0.05)
-                
-            logger.info("[+] LaMa Clean background task completed successfully.")
             res = future.result()
-            self.finished.emit(res[0], res[1])
+            if self.task == "ocr":
+                payload = (self.arena.view(self.out_h).copy(), None)
+            elif self.task == "clean":
+                payload = (self.arena.view(self.out_h).copy(), clean_patches(self.args[0], res))
+            else:
+                payload = (res, None)
         except Exception as e:
-            logger.error(f"[X] LaMa Clean Task crashed in background process: {e}")
+            self._release()
+            logger.error(f"[X] {self.task} task crashed: {e}")
             self.error.emit(str(e))
+            return
 
-    def run_transparency(self, cv_img):
-        try:
-            logger.info("[i] Executing Transparency scan in QThread...")
-
-            if cv_img is not None and len(cv_img.shape) == 3 and cv_img.shape[2] == 4:
-                # Grab EVERYTHING that isn't 100% solid opaque (catches the soft fringes)
-                mask = (cv_img[:, :, 3] < 255).astype(np.uint8) * 255
-                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-                mask = cv2.dilate(mask, kernel, iterations=1)
-            else:
-                h, w = cv_img.shape[:2] if cv_img is not None else (100, 100)
-                mask = np.zeros((h, w), dtype=np.uint8)
+        self._release()
+        logger.info(f"[+] {self.task} task completed successfully.")
+        self.finished.emit(*payload)
 
-            logger.info("[+] Transparency scan completed.")
-            self.finished.emit(mask, None)
-
-        except Exception as e:
-            logger.error(f"[X] Transparency Task crashed: {e}")
-            self.error.emit(str(e))
+    def _release(self):
+        if self.task_id is not None: end_task(self.task_id)
+        if self.arena is not None: self.arena.release()
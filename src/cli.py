@@ -0,0 +1,65 @@
+import argparse
+from src.utils.config import Config
+from src.utils.paths import Paths
+
+#/////////////////////////////////#
+#    COMMAND LINE (HEADLESS) MODE #
+#/////////////////////////////////#
+
+COMMANDS = ["batch", "quantize", "calibrate", "clear-cache"]
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="manga_cleaner", description=f"{Config.APP_NAME} headless tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="Scan and clean every page of a folder without the GUI")
+    batch.add_argument("in_dir", help="Folder with the raw pages")
+    batch.add_argument("out_dir", help="Folder that receives the *_cleaned pages")
+    batch.add_argument("--scan", choices=["ocr", "transparency"], default="ocr")
+    batch.add_argument("--format", choices=["png", "jpg"], default="png")
+    batch.add_argument("--tile-size", type=int, default=Config.DEFAULT_TILE_WIDTH,
+                       help="Max LaMa tile size in px (512-4096)")
+    batch.add_argument("--queue-depth", type=int, default=Config.PIPELINE_DEPTH,
+                       help="Pages buffered between pipeline stages")
+    batch.add_argument("--workers", type=int, default=Config.INFERENCE_WORKERS,
+                       help="Inference worker processes (0 = auto)")
+    batch.add_argument("--quality", choices=["full", "balanced", "fast"], default=Config.MODEL_QUALITY,
+                       help="Model precision (fast = INT8 on CPU / FP16 on GPU when available)")
+
+    quant = sub.add_parser("quantize", help="Build an INT8 / FP16 variant next to an FP32 model")
+    quant.add_argument("model", choices=["ocr", "lama"])
+    quant.add_argument("variant", choices=["int8", "fp16"])
+    quant.add_argument("--samples", help="Sample pages: static INT8 calibration + quality check")
+
+    calib = sub.add_parser("calibrate", help="Score a variant against FP32 on sample pages")
+    calib.add_argument("model", choices=["ocr", "lama"])
+    calib.add_argument("variant", choices=["int8", "fp16"])
+    calib.add_argument("samples", help="Folder with sample pages")
+
+    sub.add_parser("clear-cache", help="Delete the cached OCR masks and LaMa tiles")
+    return parser
+
+def run_cli(argv):
+    args = build_parser().parse_args(argv)
+    Paths.initialize()
+
+    if args.command == "batch":
+        # Imported lazily so `--help` stays instant (onnxruntime is heavy)
+        from src.backend.ai_manager import AIManager
+        from src.backend.headless import HeadlessBatch
+        AIManager.set_model_quality(args.quality)
+        runner = HeadlessBatch(args.in_dir, args.out_dir, args.scan, args.format, args.tile_size, args.queue_depth, args.workers)
+        runner.run()
+        return 1 if runner.failed else 0
+
+    if args.command == "clear-cache":
+        from src.backend.result_cache import ResultCache
+        ResultCache.clear()
+        return 0
+
+    from src.backend.model_variants import ModelVariants
+    name = f"{args.model}.onnx"
+    if args.command == "quantize":
+        ModelVariants.build(name, args.variant, args.samples)
+        if not args.samples: return 0
+    return 0 if ModelVariants.calibrate(name, args.variant, args.samples) else 1
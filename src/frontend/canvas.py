@@ -1,9 +1,11 @@
 import os
-from PySide6.QtWidgets import (QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, 
+from PySide6.QtWidgets import (QGraphicsView, QGraphicsScene,
                              QGraphicsPathItem, QGraphicsEllipseItem, QLabel)
-from PySide6.QtGui import QPixmap, QImage, QPainter, QPen, QColor, QBrush, QPainterPath, QIcon
-from PySide6.QtCore import Qt, QPointF, QRectF, Signal
+from PySide6.QtGui import QPixmap, QPainter, QPen, QColor, QBrush, QPainterPath, QIcon
+from PySide6.QtCore import Qt, QPointF, QRectF, QRect, QTimer, Signal
 import numpy as np
+from src.frontend.mask_layer import MaskLayer
+from src.frontend.tile_items import ImageItem, MaskItem
 from src.utils.paths import Paths
 
 #/////////////////////////////////#
@@ -11,7 +13,7 @@ from src.utils.paths import Paths
 #/////////////////////////////////#
 
 class MangaCanvas(QGraphicsView):
-    mask_changed = Signal()
+    mask_edited = Signal(object)  # Dirty-rect delta of one finished stroke / rect / lasso / clear
     tool_state_updated = Signal(bool)
 
     def __init__(self):
@@ -32,8 +34,8 @@ class MangaCanvas(QGraphicsView):
         painter.end()
         self.setBackgroundBrush(QBrush(checkerboard))
 
-        self.image_item = QGraphicsPixmapItem()
-        self.mask_item = QGraphicsPixmapItem()
+        self.image_item = ImageItem()
+        self.mask_item = MaskItem()
         self.mask_item.setOpacity(60 / 100.0)
         self.scene.addItem(self.image_item)
         self.scene.addItem(self.mask_item)
@@ -66,6 +68,13 @@ class MangaCanvas(QGraphicsView):
 
         self.cv_img = None
         self.mask = None
+
+        # Stroke segments only accumulate a dirty rect; it is pushed to the
+        # overlay at most once per display refresh
+        self.mask_dirty = QRect()
+        self.mask_flush_timer = QTimer(self)
+        self.mask_flush_timer.setSingleShot(True)
+        self.mask_flush_timer.timeout.connect(self.flush_mask_display)
         self.setMouseTracking(True)
         self.update_cursor_visuals()
 
@@ -119,22 +128,43 @@ class MangaCanvas(QGraphicsView):
         self.brush_size = size
         self.update_cursor_visuals()
 
-    def set_image(self, cv_img):
+    def set_image(self, cv_img, keep_mask=False):
         self.cv_img = cv_img
         h, w = cv_img.shape[:2]
-        # Support RGBA rendering if transparency is present
-        if len(cv_img.shape) == 3 and cv_img.shape[2] == 4:
-            q_img = QImage(cv_img.data, w, h, w*4, QImage.Format_RGBA8888)
-        else:
-            q_img = QImage(cv_img.data, w, h, w*3, QImage.Format_RGB888)
-        self.image_item.setPixmap(QPixmap.fromImage(q_img))
-        self.mask = QImage(w, h, QImage.Format_ARGB32)
-        self.mask.fill(Qt.transparent)
+        # RGB and RGBA pages are both converted tile by tile, at the zoom's level of detail
+        self.image_item.set_image(cv_img)
+        # Edits of the same page keep the mask (and with it the validity of its undo deltas)
+        if not (keep_mask and self.mask and (self.mask.height(), self.mask.width()) == (h, w)):
+            self.mask = MaskLayer(w, h)
         self.update_mask_display()
         self.scene.setSceneRect(0, 0, w, h)
 
-    def update_mask_display(self):
-        if self.mask: self.mask_item.setPixmap(QPixmap.fromImage(self.mask))
+    def update_image(self, rect):
+        """Redraws the (x, y, w, h) rect of the page after cv_img was edited in place"""
+        self.image_item.invalidate(*[int(v) for v in rect])
+
+    def paste_image(self, src, x, y, w, h):
+        """Copies a rect of src into the page and redraws only that rect; the mask is untouched"""
+        self.cv_img[y:y+h, x:x+w] = src[y:y+h, x:x+w]
+        self.update_image((x, y, w, h))
+
+    def update_mask_display(self, rect=None):
+        """Redraws the (x, y, w, h) rect of the mask overlay, or all of it when no rect is given"""
+        if rect is None:
+            self.mask_dirty = QRect()
+            self.mask_flush_timer.stop()
+            self.mask_item.set_mask(self.mask)
+            return
+        self.mask_dirty = self.mask_dirty.united(QRect(*[int(v) for v in rect]))
+        if not self.mask_flush_timer.isActive():
+            screen = self.screen()
+            hz = screen.refreshRate() if screen and screen.refreshRate() > 0 else 60
+            self.mask_flush_timer.start(int(1000 / hz))
+
+    def flush_mask_display(self):
+        if self.mask_dirty.isEmpty(): return
+        r, self.mask_dirty = self.mask_dirty, QRect()
+        self.mask_item.invalidate(r.x(), r.y(), r.width(), r.height())
 
     def wheelEvent(self, event):
         zoom = 1.25 if event.angleDelta().y() > 0 else 0.8
@@ -148,7 +178,7 @@ class MangaCanvas(QGraphicsView):
             # If the mask is locked by AI, silently reject all drawing inputs
             return
         elif event.button() == Qt.LeftButton and self.mask:
-            self.mask_changed.emit()
+            self.mask.begin_edit()
             self.is_drawing = True
             self.start_pt = self.mapToScene(event.pos())
             self.last_pt = self.start_pt
@@ -176,40 +206,52 @@ class MangaCanvas(QGraphicsView):
             if self.current_tool == "RECT": self.paint_mask_rect(self.start_pt, curr_pt)
             elif self.current_tool == "LASSO": self.paint_mask_lasso()
             self.is_drawing = False
+            delta = self.mask.end_edit()
+            if delta: self.mask_edited.emit(delta)
             self.preview_item.setPath(QPainterPath())
         super().mouseReleaseEvent(event)
 
     def get_painter(self):
-        painter = QPainter(self.mask)
+        painter = self.mask.painter()
         painter.setRenderHint(QPainter.Antialiasing)
         
         if self.current_tool == "ERASER" or self.is_eraser:
             painter.setCompositionMode(QPainter.CompositionMode_Clear)
             color = Qt.transparent
         else:
+            # Only coverage is stored; the overlay tint comes from the mask layer
             painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
-            color = QColor(255, 0, 0, 255)
+            color = QColor(0, 0, 0, 255)
             
         return painter, color
 
+    def touch_mask(self, x1, y1, x2, y2):
+        """Snapshots the area about to be painted for undo and queues it for redraw"""
+        self.mask.touch(x1, y1, x2, y2)
+        self.update_mask_display((int(x1), int(y1), int(x2 - x1) + 2, int(y2 - y1) + 2))
+
     def paint_mask_stroke(self, p1, p2):
+        # Round caps reach half a brush past the endpoints, plus a pixel of antialiasing
+        r = self.brush_size / 2 + 2
+        self.touch_mask(min(p1.x(), p2.x()) - r, min(p1.y(), p2.y()) - r, max(p1.x(), p2.x()) + r, max(p1.y(), p2.y()) + r)
         painter, color = self.get_painter()
         painter.setPen(QPen(color, self.brush_size, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
         painter.drawLine(p1, p2)
         painter.end()
-        self.update_mask_display()
 
     def paint_mask_rect(self, p1, p2):
+        rect = QRectF(p1, p2).normalized()
+        self.touch_mask(rect.left() - 1, rect.top() - 1, rect.right() + 1, rect.bottom() + 1)
         painter, color = self.get_painter()
-        painter.fillRect(QRectF(p1, p2).normalized(), QBrush(color))
+        painter.fillRect(rect, QBrush(color))
         painter.end()
-        self.update_mask_display()
 
     def paint_mask_lasso(self):
+        rect = self.lasso_path.boundingRect()
+        self.touch_mask(rect.left() - 1, rect.top() - 1, rect.right() + 1, rect.bottom() + 1)
         painter, color = self.get_painter()
         painter.fillPath(self.lasso_path, QBrush(color))
         painter.end()
-        self.update_mask_display()
 
     def set_mask_opacity(self, opacity_percent):
         # Purely cosmetic: Adjusts the UI layer visibility, leaving math matrix intact
@@ -219,6 +261,25 @@ class MangaCanvas(QGraphicsView):
     def clear_mask(self):
         if self.is_locked: return  # Block clearing if AI is working
         if self.mask:
-            self.mask_changed.emit()
-            self.mask.fill(Qt.transparent)
+            self.replace_mask(np.zeros_like(self.mask.data))
+
+    def replace_mask(self, data, color=None, notify=True):
+        """
+        Swaps in new coverage (clear / scan result) as one undoable edit and
+        returns its delta. notify=False skips mask_edited for changes the app
+        makes itself; the caller then records the delta.
+        """
+        old_color = self.mask.color
+        delta = self.mask.replace(data, color)
+        if self.mask.color != old_color:
             self.update_mask_display()
+        elif delta:
+            self.update_mask_display(delta[0][:4])
+        if delta and notify: self.mask_edited.emit(delta)
+        return delta
+
+    def apply_mask_delta(self, delta, undo=True):
+        """Undo / redo of one mask step; a step that changes the tint redraws every tile"""
+        old_color = self.mask.color
+        rect = self.mask.apply(delta, undo)
+        self.update_mask_display(rect if self.mask.color == old_color else None)
@@ -1,16 +1,17 @@
 import os
-import cv2
 import numpy as np
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QFrame, QSplitter, QFileDialog,
                              QMenu, QMessageBox, QGraphicsView, QProgressBar, QInputDialog,
                              QDialog, QComboBox, QDialogButtonBox, QFormLayout, QCheckBox)
-from PySide6.QtGui import QShortcut, QKeySequence, QImage
-from PySide6.QtCore import Qt, QTimer, QThread
+from PySide6.QtGui import QShortcut, QKeySequence
+from PySide6.QtCore import Qt, QTimer
 from enum import Enum, auto
 from src.frontend.widgets import FileListWidget, ToolGroup, LabeledSlider, HardwareMonitor
 from src.frontend.canvas import MangaCanvas
 from src.frontend.help_system import HelpSystem
+from src.frontend.session_store import SessionStore
+from src.frontend.mask_layer import MaskLayer
 from src.utils.system_info import SystemMonitor
 from src.utils.history import HistoryManager
 from src.utils.config import Config
@@ -18,7 +19,11 @@ from src.utils.logger import logger
 from src.backend.photoshop import PhotoshopBridge
 from src.backend.photopea import PhotopeaBridge
 from src.backend.batch_engine import BatchEngine
-from src.backend.workers import AIWorker, get_pool, _run_flush_process
+from src.backend.page_io import PageIO
+from src.backend.page_cache import PageCache
+from src.backend.folder_index import FolderIndex
+from src.backend.workers import AIWorker
+from src.backend.pool import get_pool_size
 
 #/////////////////////////////////#
 #         PAGE STATE ENUM         #
@@ -43,12 +48,14 @@ class MainWindow(QMainWindow):
         self.monitor = SystemMonitor()
         self.history = HistoryManager(Config.MAX_HISTORY)
         self.batch_engine = BatchEngine()
-        self.worker_thread = None
+        self.active_workers = set()
+        self.max_workers = get_pool_size()
         self.is_batching = False
         self.is_currently_erasing = False
         self.current_img_path = None
         self.batch_scan_type = "ocr"
-        self.image_sessions = {}
+        self.image_sessions = SessionStore()
+        self.page_cache = PageCache()
         self.page_states = {}
         self.task_queue = []
         self.total_tasks = 0
@@ -143,8 +150,8 @@ class MainWindow(QMainWindow):
         lp_lay.addWidget(self.btn_batch)
 
         self.canvas = MangaCanvas()
-        self.canvas.mask_changed.connect(lambda: self.history.push_mask_state(self.canvas.mask))
-        self.canvas.mask_changed.connect(self.mark_current_modified)
+        self.canvas.mask_edited.connect(lambda delta: self.history.push_mask_delta(delta))
+        self.canvas.mask_edited.connect(lambda delta: self.mark_current_modified())
         self.canvas.tool_state_updated.connect(self.on_eraser_toggle_ui)
         
         self.rp = QFrame()
@@ -277,37 +284,31 @@ class MainWindow(QMainWindow):
 
     def on_undo_image(self):
         if self.canvas.is_locked: return
-        res = self.history.pop_image_undo(self.canvas.cv_img)
-        if res:
-            x, y, p = res
+        rect = self.history.pop_image_undo(self.canvas.cv_img)
+        if rect:
             self.mark_current_modified()
-            self.canvas.cv_img[y:y+p.shape[0], x:x+p.shape[1]] = p
-            self.canvas.set_image(self.canvas.cv_img)
+            self.canvas.update_image(rect)
 
     def on_redo_image(self):
         if self.canvas.is_locked: return
-        res = self.history.pop_image_redo(self.canvas.cv_img)
-        if res:
-            x, y, p = res
+        rect = self.history.pop_image_redo(self.canvas.cv_img)
+        if rect:
             self.mark_current_modified()
-            self.canvas.cv_img[y:y+p.shape[0], x:x+p.shape[1]] = p
-            self.canvas.set_image(self.canvas.cv_img)
+            self.canvas.update_image(rect)
 
     def on_undo_mask(self):
         if self.canvas.is_locked: return
-        res = self.history.pop_mask_undo(self.canvas.mask)
-        if res:
+        delta = self.history.pop_mask_undo()
+        if delta:
             self.mark_current_modified()
-            self.canvas.mask = res
-            self.canvas.update_mask_display()
+            self.canvas.apply_mask_delta(delta, undo=True)
 
     def on_redo_mask(self):
         if self.canvas.is_locked: return
-        res = self.history.pop_mask_redo(self.canvas.mask)
-        if res:
+        delta = self.history.pop_mask_redo()
+        if delta:
             self.mark_current_modified()
-            self.canvas.mask = res
-            self.canvas.update_mask_display()
+            self.canvas.apply_mask_delta(delta, undo=False)
 
     #/////////////////////////////////#
     #      AI EXECUTION PIPELINE      #
@@ -317,10 +318,9 @@ class MainWindow(QMainWindow):
         """Identifies ALL files currently being processed or waiting and globally updates UI"""
         locked_paths = set()
         
-        # 1. Grab file currently running in AI worker thread
-        if self.worker_thread is not None and hasattr(self, 'worker'):
-            active_path = getattr(self.worker, 'source_path', None)
-            if active_path: locked_paths.add(active_path)
+        # 1. Grab files currently running in AI worker threads
+        for worker in self.active_workers:
+            locked_paths.add(worker.source_path)
             
         # 2. Grab all manual/single-task queued files
         for item in self.task_queue:
@@ -362,7 +362,8 @@ class MainWindow(QMainWindow):
 
     def on_worker_progress(self, val):
         """Calculates fractional progress for smooth overall queue tracking"""
-        if self.worker.task != "clean" or self.total_lama_tasks == 0: return
+        worker = self.sender()
+        if worker is None or worker.task != "clean" or self.total_lama_tasks == 0: return
         base_progress = (self.completed_lama_tasks / self.total_lama_tasks) * 100
         task_fraction = (val / 100.0) * (100 / self.total_lama_tasks)
         self.progress_bar.setValue(int(base_progress + task_fraction))
@@ -378,18 +379,25 @@ class MainWindow(QMainWindow):
         self._process_queue()
 
     def _process_queue(self):
-        """Pulls the next task from the queue and runs it"""
-        if self.worker_thread is not None:
-            return
-
+        """Hands queued tasks to idle pool workers until every worker is busy"""
         if not self.task_queue:
+            # Sessions stay warm in the workers' model cache between tasks
             self._update_queue_ui()
-            if not self.is_batching:
-                get_pool().submit(_run_flush_process, False)
             return
 
-        item = self.task_queue.pop(0)
- 
+        busy_paths = {w.source_path for w in self.active_workers}
+        while len(self.active_workers) < self.max_workers:
+            # Tasks of one page must run in order, so skip pages that already have one running
+            item = next((it for it in self.task_queue if it["path"] not in busy_paths), None)
+            if item is None: break
+            self.task_queue.remove(item)
+            busy_paths.add(item["path"])
+            self._start_worker(item)
+
+        # Call this AFTER thread initialization to lock the canvas safely!
+        self._update_queue_ui()
+
+    def _start_worker(self, item):
         source_path = item["path"]
         
         # --- Update status to WAITING since AI is processing it now ---
@@ -398,49 +406,43 @@ class MainWindow(QMainWindow):
         # --------------------------------------------------------------
 
         self.setCursor(Qt.WaitCursor)
-        self.worker_thread = QThread()
-        self.worker = AIWorker(item["task"], item["args"])
-        self.worker.source_path = source_path
-
-        self.worker.moveToThread(self.worker_thread)
-        self.worker_thread.started.connect(self.worker.process)
-        self.worker.progress.connect(self.on_worker_progress)
-        self.worker.finished.connect(self.on_task_finished)
-        self.worker.error.connect(self.on_task_error)
-        self.worker_thread.finished.connect(self.worker.deleteLater)
-        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
-
-        self.worker_thread.start()
-        
-        # Call this AFTER thread initialization to lock the canvas safely!
-        self._update_queue_ui() 
+        worker = AIWorker(item["task"], item["args"])
+        worker.source_path = source_path
 
-    def stop_thread(self):
-        self.setCursor(Qt.ArrowCursor)
-        if self.worker_thread:
-            self.worker_thread.quit()
-            self.worker_thread.wait()
-            self.worker_thread = None
+        worker.progress.connect(self.on_worker_progress)
+        worker.finished.connect(self.on_task_finished)
+        worker.error.connect(self.on_task_error)
+
+        self.active_workers.add(worker)
+        worker.process()
+
+    def release_worker(self, worker):
+        if worker in self.active_workers:
+            self.active_workers.discard(worker)
+            worker.deleteLater()
+        if not self.active_workers:
+            self.setCursor(Qt.ArrowCursor)
         self._update_queue_ui()
 
     def on_task_error(self, message):
-        source_path = getattr(self.worker, 'source_path', None)
+        worker = self.sender()
+        source_path = getattr(worker, 'source_path', None)
         if source_path:
             self.page_states[source_path] = PageState.ERROR
             self.file_list.update_item_state(source_path, "error")
 
-        self.stop_thread()
+        self.release_worker(worker)
         self.is_batching = False
         self.task_queue.clear()
         self.total_lama_tasks = 0
         self.completed_lama_tasks = 0
-        self._update_queue_ui()
-        get_pool().submit(_run_flush_process, False).result()
+        self._process_queue()
         QMessageBox.critical(self, "Hardware Error", message)
 
     def on_task_finished(self, result, patches):
-        task = self.worker.task  
-        source_path = getattr(self.worker, 'source_path', self.current_img_path)
+        worker = self.sender()
+        task = worker.task  
+        source_path = getattr(worker, 'source_path', self.current_img_path)
         is_active = (source_path == self.current_img_path)
 
         # --- Flag file accurately on completion ---
@@ -452,49 +454,55 @@ class MainWindow(QMainWindow):
         if task == "clean":
             self.completed_lama_tasks += 1
             target_history = self.history if is_active else self.image_sessions[source_path]["history"]
-            if len(patches) > 0:
-                for x, y, p in patches: target_history.push_image_action(x, y, p)
+            target_history.push_image_action(patches)
 
             if is_active:
-                self.canvas.set_image(result)
-                self.canvas.clear_mask()
+                # The canvas is still locked for this task, so bypass clear_mask. The clear stays undoable,
+                # but it is not a user edit and must not mark the page MODIFIED via mask_edited
+                if result.shape == self.canvas.cv_img.shape:
+                    # Only the inpainted tiles differ from the page on the canvas
+                    for x, y, p in patches: self.canvas.paste_image(result, x, y, p.shape[1], p.shape[0])
+                else:
+                    self.canvas.set_image(result, keep_mask=True)
+                delta = self.canvas.replace_mask(np.zeros_like(self.canvas.mask.data), notify=False)
+                if delta: self.history.push_mask_delta(delta)
             else:
                 self.image_sessions[source_path]["img"] = result
-                self.image_sessions[source_path]["mask"].fill(Qt.transparent)
+                self._replace_session_mask(source_path, np.zeros_like(self.image_sessions[source_path]["mask"].data))
 
         elif task in ["ocr", "transparency"]:
-            h, w = result.shape[:2]
-            rgba = np.zeros((h, w, 4), dtype=np.uint8)
-            rgba[result > 0] = [0, 255, 0, 255] if task == "transparency" else [255, 0, 0, 255]
-            new_mask = QImage(rgba.data, w, h, w*4, QImage.Format_ARGB32).copy()
+            color = MaskLayer.GREEN if task == "transparency" else MaskLayer.RED
+            coverage = (result > 0).astype(np.uint8) * 255
 
             if is_active:
-                self.canvas.mask = new_mask
-                self.canvas.update_mask_display()
+                self.canvas.replace_mask(coverage, color)
             else:
-                self.image_sessions[source_path]["mask"] = new_mask
+                self._replace_session_mask(source_path, coverage, color)
 
-        self.stop_thread()
+        self.release_worker(worker)
 
         # Handle Background Batching Loop
         if self.is_batching:
             if task == "clean":
                 final_img = self.canvas.cv_img if is_active else self.image_sessions[source_path]["img"]
-                is_last = self.batch_engine.save_current(final_img)
+                is_last = self.batch_engine.save_page(source_path, final_img)
                 if is_last: self.finalize_batch()
-                else: self.step_batch() # Chain the next scan strictly after this clean finishes
+                else: self.step_batch() # This page's worker is free again, feed it the next page
             elif task in ["ocr", "transparency"]:
-                mask_q = self.canvas.mask if is_active else self.image_sessions[source_path]["mask"]
+                mask = self.canvas.mask if is_active else self.image_sessions[source_path]["mask"]
                 img_cv = self.canvas.cv_img if is_active else self.image_sessions[source_path]["img"]
-
-                ptr = mask_q.bits()
-                mask_np = np.frombuffer(ptr, np.uint8).reshape((mask_q.height(), mask_q.width(), 4))
-                mask_gray = mask_np[:, :, 3].copy()
+                mask_gray = mask.data.copy()
                 t_size = self.t_slider.slider.value() * 512
                 self.enqueue_task("clean", source_path, img_cv.copy(), mask_gray, t_size)
 
         self._process_queue()
 
+    def _replace_session_mask(self, path, data, color=None):
+        """Background-page counterpart of MangaCanvas.replace_mask"""
+        session = self.image_sessions[path]
+        delta = session["mask"].replace(data, color)
+        if delta: session["history"].push_mask_delta(delta)
+
     def on_ocr_scan(self):
         if self.canvas.cv_img is None or self.canvas.is_locked: return
         self.mark_current_modified()
@@ -507,13 +515,11 @@ class MainWindow(QMainWindow):
 
     def on_lama_clean(self):
         if self.canvas.cv_img is None or self.canvas.is_locked: return
-        ptr = self.canvas.mask.bits()
-        mask_np = np.frombuffer(ptr, np.uint8).reshape((self.canvas.mask.height(), self.canvas.mask.width(), 4))
-        mask_gray = mask_np[:, :, 3].copy()
+        mask_gray = self.canvas.mask.data.copy()
 
         if not np.any(mask_gray):
             if self.is_batching:
-                is_last = self.batch_engine.save_current(self.canvas.cv_img)
+                is_last = self.batch_engine.save_page(self.current_img_path, self.canvas.cv_img)
                 if is_last: self.finalize_batch()
                 else: self.step_batch()
             else:
@@ -554,31 +560,40 @@ class MainWindow(QMainWindow):
             paths = [self.file_list.item(i).data(Qt.UserRole) for i in range(self.file_list.count())]
 
         self.batch_engine.initialize_batch(paths, fmt)
-        get_pool().submit(_run_flush_process, True).result()
         
         self.is_batching = True
         self.total_lama_tasks += len(paths)
-        self.step_batch()
+        # Keep one page in flight per pool worker
+        for _ in range(self.max_workers):
+            self.step_batch()
         
         self._check_lock_state() # Lock UI instantly!
 
     def step_batch(self):
         path = self.batch_engine.get_next()
         if path:
+            # Pages the workers will ask for next are decoded while this one is scanned
+            upcoming = self.batch_engine.files[self.batch_engine.current_index:self.batch_engine.current_index + Config.PREFETCH_PAGES]
+            self.page_cache.prefetch([p for p in upcoming if p not in self.image_sessions], group="batch")
+
             if path not in self.image_sessions:
-                img_data = np.fromfile(path, dtype=np.uint8)
-                img = cv2.imdecode(img_data, cv2.IMREAD_UNCHANGED)
+                img = self.page_cache.take(path)
                 if img is not None:
-                    if len(img.shape) == 2: img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-                    elif len(img.shape) == 3 and img.shape[2] == 4: img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
-                    else: img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
                     self.image_sessions[path] = {
                         "img": img.copy(),
-                        "mask": QImage(img.shape[1], img.shape[0], QImage.Format_ARGB32),
+                        "mask": MaskLayer(img.shape[1], img.shape[0]),
                         "history": HistoryManager(Config.MAX_HISTORY)
                     }
-                    self.image_sessions[path]["mask"].fill(Qt.transparent)
+                else:
+                    # Unreadable page: flag it and keep the rest of the batch moving
+                    logger.error(f"Failed to decode image: {path}")
+                    self.total_lama_tasks -= 1
+                    self.page_states[path] = PageState.ERROR
+                    self.file_list.update_item_state(path, "error")
+                    self._update_queue_ui()
+                    if self.batch_engine.skip_page(): self.finalize_batch()
+                    else: self.step_batch()
+                    return
 
             # --- Check if this is the live active canvas ---
             is_active = (path == self.current_img_path)
@@ -586,12 +601,9 @@ class MainWindow(QMainWindow):
             # Send to queue based on scan mode
             if self.batch_scan_type == "mask":
                 # Pull from the live canvas if active, otherwise pull from cache
-                mask_q = self.canvas.mask if is_active else self.image_sessions[path]["mask"]
+                mask = self.canvas.mask if is_active else self.image_sessions[path]["mask"]
                 img_cv = self.canvas.cv_img if is_active else self.image_sessions[path]["img"]
-
-                ptr = mask_q.bits()
-                mask_np = np.frombuffer(ptr, np.uint8).reshape((mask_q.height(), mask_q.width(), 4))
-                mask_gray = mask_np[:, :, 3].copy()
+                mask_gray = mask.data.copy()
 
                 # If using manual masks, skip straight to saving if the mask is empty
                 if not np.any(mask_gray):
@@ -603,7 +615,7 @@ class MainWindow(QMainWindow):
                     
                     self._update_queue_ui()
                     
-                    is_last = self.batch_engine.save_current(img_cv)
+                    is_last = self.batch_engine.save_page(path, img_cv)
                     if is_last: self.finalize_batch()
                     else: self.step_batch()
                     return
@@ -617,7 +629,7 @@ class MainWindow(QMainWindow):
 
     def finalize_batch(self):
         self.is_batching = False
-        get_pool().submit(_run_flush_process, False).result()
+        self.batch_engine.wait_for_writes()
         self._check_lock_state() # Unlock UI instantly!
         
         self.setCursor(Qt.WaitCursor)
@@ -640,13 +652,19 @@ class MainWindow(QMainWindow):
         p = QFileDialog.getExistingDirectory(self, "Select Folder")
         if p:
             self.image_sessions.clear()
+            self.page_cache.clear()
             self.page_states.clear()
             self.file_list.clear()
-            for f in sorted(os.listdir(p)):
-                if f.lower().endswith(('.jpg','.jpeg','.png','.webp')):
-                    full_path = os.path.join(p, f)
-                    self.page_states[full_path] = PageState.UNMODIFIED
-                    self.file_list.add_file(full_path)
+            # Names, sizes and dates come from one directory pass; headers and thumbnails follow lazily
+            index = FolderIndex(p)
+            pages = index.scan()
+            index.save()
+            for full_path in pages:
+                self.page_states[full_path] = PageState.UNMODIFIED
+            self.file_list.set_index(index)
+            self.file_list.add_files(pages)
+            # The first pages are usually opened first
+            self.page_cache.prefetch(pages[:Config.PREFETCH_PAGES])
 
     def mark_current_modified(self):
         """Transitions the page state to MODIFIED via Enum"""
@@ -668,6 +686,7 @@ class MainWindow(QMainWindow):
             }
 
         self.current_img_path = path_real
+        self.image_sessions.pinned = path_real
 
         # restore incoming image 
         if path_real in self.image_sessions:
@@ -677,15 +696,10 @@ class MainWindow(QMainWindow):
             self.canvas.mask = session["mask"].copy()
             self.canvas.update_mask_display()
         else:
-            # load fresh from hard drive
-            img_data = np.fromfile(path_real, dtype=np.uint8)
-            img = cv2.imdecode(img_data, cv2.IMREAD_UNCHANGED)
+            # load fresh from hard drive (usually already decoded by the prefetcher)
+            img = self.page_cache.take(path_real)
 
             if img is not None:
-                if len(img.shape) == 2: img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-                elif len(img.shape) == 3 and img.shape[2] == 4: img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
-                else: img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
                 self.history = HistoryManager(Config.MAX_HISTORY)
                 self.canvas.set_image(img)
                 
@@ -699,37 +713,31 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "Load Error", f"The file is corrupted or cannot be processed:\n{os.path.basename(path_real)}")
                 logger.error(f"Failed to decode image: {path_real}")
                 
+        self._prefetch_around(self.file_list.row(it))
+
         # --- Safely lock/unlock UI based on background state upon clicking ---
         self._check_lock_state()
 
+    def _prefetch_around(self, row):
+        """Decodes the next / previous PREFETCH_PAGES pages in the background, nearest first"""
+        rows = []
+        for d in range(1, Config.PREFETCH_PAGES + 1):
+            rows += [row + d, row - d]
+        paths = [self.file_list.item(r).data(Qt.UserRole) for r in rows if 0 <= r < self.file_list.count()]
+        self.page_cache.prefetch([p for p in paths if p not in self.image_sessions])
+
     def on_export(self, fmt):
         if self.canvas.cv_img is None: return
         path, _ = QFileDialog.getSaveFileName(self, "Export", "", f"{fmt.upper()} (*.{fmt})")
         if path:
-            if len(self.canvas.cv_img.shape) == 3 and self.canvas.cv_img.shape[2] == 4:
-                img_out = cv2.cvtColor(self.canvas.cv_img, cv2.COLOR_RGBA2BGRA)
-                if fmt.lower() in ["jpg", "jpeg"]:
-                    img_out = cv2.cvtColor(img_out, cv2.COLOR_BGRA2BGR)
-            else:
-                img_out = cv2.cvtColor(self.canvas.cv_img, cv2.COLOR_RGB2BGR)
-                
-            ext = os.path.splitext(path)[1]
-            is_success, im_buf_arr = cv2.imencode(ext, img_out)
-            if is_success:
-                im_buf_arr.tofile(path)
+            PageIO.save(self.canvas.cv_img, path)
 
     def on_editor_bridge(self, target="photoshop"):
         if self.canvas.cv_img is None or not self.current_img_path: return
 
-        img_data = np.fromfile(self.current_img_path, dtype=np.uint8)
-        orig = cv2.imdecode(img_data, cv2.IMREAD_UNCHANGED)
+        orig = PageIO.load(self.current_img_path)
 
         if orig is not None:
-            if len(orig.shape) == 3 and orig.shape[2] == 4:
-                orig = cv2.cvtColor(orig, cv2.COLOR_BGRA2RGBA)
-            else:
-                orig = cv2.cvtColor(orig, cv2.COLOR_BGR2RGB)
-
             self.setCursor(Qt.WaitCursor)
             if target == "photoshop":
                 res = PhotoshopBridge.send_to_ps(orig, self.canvas.cv_img)
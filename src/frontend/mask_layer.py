@@ -0,0 +1,127 @@
+import zlib
+import numpy as np
+from PySide6.QtGui import QImage, QPainter, qRgba
+
+#/////////////////////////////////#
+#     1-BYTE CANONICAL MASK       #
+#/////////////////////////////////#
+
+class MaskLayer:
+    """
+    The mask is one uint8 coverage value per pixel (the alpha the old ARGB32
+    QImage carried). QPainter draws straight into the buffer through an
+    Alpha8 view, and the coloured overlay is an Indexed8 view whose palette
+    maps coverage to the tint, so no 4-byte copy of the page is ever stored.
+    """
+    RED = (255, 0, 0)
+    GREEN = (0, 255, 0)
+    EDIT_TILE = 128  # Granularity of the before-copies taken while an edit is open
+    _palettes = {}
+
+    def __init__(self, width, height, color=RED, data=None):
+        self.data = np.zeros((height, width), dtype=np.uint8) if data is None else data
+        self.color = color
+        self._target = None
+        self._before = None  # (ty, tx) -> tile copy while an edit is open
+
+    @staticmethod
+    def from_array(alpha, color=RED):
+        return MaskLayer(alpha.shape[1], alpha.shape[0], color, np.ascontiguousarray(alpha, dtype=np.uint8))
+
+    def width(self):
+        return self.data.shape[1]
+
+    def height(self):
+        return self.data.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def copy(self):
+        return MaskLayer(self.width(), self.height(), self.color, self.data.copy())
+
+    def clear(self):
+        self.data.fill(0)
+
+    def painter(self):
+        # The QImage only borrows the buffer; keep it referenced until the painter ends
+        self._target = QImage(self.data.data, self.width(), self.height(), self.width(), QImage.Format_Alpha8)
+        return QPainter(self._target)
+
+    #/////////////////////////////////#
+    #   DIRTY-RECT EDIT DELTAS        #
+    #/////////////////////////////////#
+
+    # A delta is a list of (x, y, w, h, before, after) with zlib-packed bytes,
+    # so undo costs scale with the edited area instead of the page. Entries
+    # from replace() also carry (old color, new color) so undo restores the tint
+
+    def begin_edit(self):
+        self._before = {}
+
+    def touch(self, x1, y1, x2, y2):
+        """Call before painting inside the rect: snapshots the tiles it covers once per edit"""
+        if self._before is None: return
+        t = MaskLayer.EDIT_TILE
+        h, w = self.data.shape
+        x1, y1 = max(0, int(x1) // t), max(0, int(y1) // t)
+        x2, y2 = min((w - 1) // t, int(x2) // t), min((h - 1) // t, int(y2) // t)
+        for ty in range(y1, y2 + 1):
+            for tx in range(x1, x2 + 1):
+                if (ty, tx) not in self._before:
+                    self._before[(ty, tx)] = self.data[ty*t:(ty+1)*t, tx*t:(tx+1)*t].copy()
+
+    def end_edit(self):
+        """Closes the edit; returns its delta, or None if no pixel changed"""
+        before, self._before = self._before, None
+        t = MaskLayer.EDIT_TILE
+        delta = []
+        for (ty, tx), old in (before or {}).items():
+            new = self.data[ty*t:ty*t+old.shape[0], tx*t:tx*t+old.shape[1]]
+            if not np.array_equal(old, new):
+                delta.append(MaskLayer._pack(tx*t, ty*t, old, new))
+        return delta or None
+
+    def replace(self, data, color=None):
+        """
+        Swaps in new coverage (scan results) and optionally a new tint; returns
+        the delta of the changed box, or None if neither changed
+        """
+        color = color or self.color
+        changed = self.data != data
+        rows, cols = np.any(changed, axis=1), np.any(changed, axis=0)
+        if rows.any():
+            y1, y2 = np.argmax(rows), len(rows) - np.argmax(rows[::-1])
+            x1, x2 = np.argmax(cols), len(cols) - np.argmax(cols[::-1])
+            entry = MaskLayer._pack(x1, y1, self.data[y1:y2, x1:x2], data[y1:y2, x1:x2])
+        elif color != self.color:
+            entry = MaskLayer._pack(0, 0, self.data[:0, :0], data[:0, :0])  # Tint only
+        else:
+            return None
+        np.copyto(self.data, data)
+        delta = [entry + (self.color, color)]
+        self.color = color
+        return delta
+
+    def apply(self, delta, undo=True):
+        """Writes one side of a delta back; returns the bounding rect (x, y, w, h) it touched"""
+        for d in delta:
+            x, y, w, h, before, after = d[:6]
+            self.data[y:y+h, x:x+w] = np.frombuffer(zlib.decompress(before if undo else after), np.uint8).reshape(h, w)
+            if len(d) > 6: self.color = d[6] if undo else d[7]
+        x1 = min(d[0] for d in delta)
+        y1 = min(d[1] for d in delta)
+        return x1, y1, max(d[0] + d[2] for d in delta) - x1, max(d[1] + d[3] for d in delta) - y1
+
+    @staticmethod
+    def _pack(x, y, before, after):
+        h, w = before.shape
+        return (int(x), int(y), w, h, zlib.compress(np.ascontiguousarray(before).tobytes(), 1),
+                zlib.compress(np.ascontiguousarray(after).tobytes(), 1))
+
+    @staticmethod
+    def _palette(color):
+        if color not in MaskLayer._palettes:
+            MaskLayer._palettes[color] = [qRgba(*color, a) for a in range(256)]
+        return MaskLayer._palettes[color]
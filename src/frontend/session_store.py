@@ -0,0 +1,146 @@
+import os
+import atexit
+import shutil
+import pickle
+import hashlib
+import cv2
+from collections import OrderedDict
+from src.frontend.mask_layer import MaskLayer
+from src.utils.history import HistoryManager
+from src.utils.config import Config
+from src.utils.paths import Paths
+from src.utils.logger import logger
+
+#/////////////////////////////////#
+#   BOUNDED PAGE SESSION STORE    #
+#/////////////////////////////////#
+
+class SessionStore:
+    """
+    Drop-in for the old image_sessions dict ({"img", "mask", "history"} per
+    page). Pages past the RAM budget are spilled, least recently used first,
+    to one lossless file each in Paths.SESSIONS and read back transparently
+    the next time they are looked up.
+    """
+    def __init__(self, budget_mb=None):
+        self.budget = (budget_mb or Config.SESSION_RAM_BUDGET_MB) * 1024 * 1024
+        self.resident = OrderedDict()  # path -> session, oldest first
+        self.spilled = set()
+        self.pinned = None  # The page on the canvas is never spilled
+        # One folder per process; spill files only mean something to the run that wrote them
+        self.dir = os.path.join(Paths.SESSIONS, str(os.getpid()))
+        SessionStore._remove_stale()
+        os.makedirs(self.dir, exist_ok=True)
+        atexit.register(shutil.rmtree, self.dir, True)
+
+    def __contains__(self, path):
+        return path in self.resident or path in self.spilled
+
+    def __getitem__(self, path):
+        if path in self.resident:
+            self.resident.move_to_end(path)
+            return self.resident[path]
+        if path not in self.spilled:
+            raise KeyError(path)
+
+        session = self._restore(path)
+        self.spilled.discard(path)
+        self.resident[path] = session
+        self._enforce(keep=path)
+        return session
+
+    def __setitem__(self, path, session):
+        if path in self.spilled:
+            self.spilled.discard(path)
+            self._remove_file(path)
+        self.resident[path] = session
+        self.resident.move_to_end(path)
+        self._enforce(keep=path)
+
+    def clear(self):
+        self.resident.clear()
+        for path in self.spilled: self._remove_file(path)
+        self.spilled.clear()
+
+    #/////////////////////////////////#
+    #          SPILL / RESTORE        #
+    #/////////////////////////////////#
+
+    def _enforce(self, keep=None):
+        # Sizes are re-measured every time: sessions are mutated in place by the window
+        sizes = {p: SessionStore._nbytes(s) for p, s in self.resident.items()}
+        total = sum(sizes.values())
+        for path in list(self.resident):
+            if total <= self.budget: break
+            if path in (keep, self.pinned): continue
+            self._spill(path, self.resident.pop(path))
+            total -= sizes[path]
+
+    def _spill(self, path, session):
+        h = session["history"]
+        state = {
+            "img": SessionStore._encode(session["img"]),
+            "mask": SessionStore._encode_mask(session["mask"]),
+            "limit": h.limit,
+            "img_undo": [[HistoryManager.pack(e) for e in step] for step in h.img_undo],
+            "img_redo": [[HistoryManager.pack(e) for e in step] for step in h.img_redo],
+            # Mask deltas are already zlib-packed bytes
+            "mask_undo": h.mask_undo,
+            "mask_redo": h.mask_redo,
+        }
+        with open(self._file(path), "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled.add(path)
+        logger.info(f"[i] Session spilled to disk: {os.path.basename(path)}")
+
+    def _restore(self, path):
+        with open(self._file(path), "rb") as f:
+            state = pickle.load(f)
+        self._remove_file(path)
+
+        history = HistoryManager(state["limit"])
+        # Patches stay packed until they are undone
+        history.img_undo = state["img_undo"]
+        history.img_redo = state["img_redo"]
+        history.mask_undo = state["mask_undo"]
+        history.mask_redo = state["mask_redo"]
+        logger.info(f"[i] Session restored from disk: {os.path.basename(path)}")
+        return {"img": SessionStore._decode(state["img"]), "mask": SessionStore._decode_mask(state["mask"]), "history": history}
+
+    @staticmethod
+    def _nbytes(session):
+        return session["img"].nbytes + session["mask"].nbytes + session["history"].nbytes()
+
+    @staticmethod
+    def _encode(arr):
+        # PNG is lossless for 8-bit RGB(A); level 1 favours spill speed over size
+        return cv2.imencode(".png", arr, [cv2.IMWRITE_PNG_COMPRESSION, 1])[1]
+
+    @staticmethod
+    def _decode(buf):
+        return cv2.imdecode(buf, cv2.IMREAD_UNCHANGED)
+
+    @staticmethod
+    def _encode_mask(mask):
+        return mask.color, SessionStore._encode(mask.data)
+
+    @staticmethod
+    def _decode_mask(state):
+        color, buf = state
+        return MaskLayer.from_array(SessionStore._decode(buf), color)
+
+    def _file(self, path):
+        return os.path.join(self.dir, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".session")
+
+    def _remove_file(self, path):
+        try: os.remove(self._file(path))
+        except OSError: pass
+
+    @staticmethod
+    def _remove_stale():
+        # Left behind by sessions that crashed before their atexit cleanup
+        import psutil
+        if not os.path.isdir(Paths.SESSIONS): return
+        for entry in os.scandir(Paths.SESSIONS):
+            if entry.name.isdigit() and not psutil.pid_exists(int(entry.name)):
+                shutil.rmtree(entry.path, ignore_errors=True)
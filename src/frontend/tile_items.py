@@ -0,0 +1,208 @@
+import math
+import threading
+import cv2
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtWidgets import QGraphicsItem, QGraphicsObject, QStyleOptionGraphicsItem
+from PySide6.QtGui import QPixmap, QImage
+from PySide6.QtCore import QRectF, Signal
+from src.frontend.mask_layer import MaskLayer
+
+#/////////////////////////////////#
+#   TILED LOD IMAGE DISPLAY ITEM  #
+#/////////////////////////////////#
+
+class ImageItem(QGraphicsObject):
+    """
+    Shows the page as TILE-sized pixmaps taken from a pyramid of
+    half-resolution levels. Only visible tiles are converted, from the
+    level closest to the current zoom, so no texture ever spans the page and
+    zoomed-out strips draw a handful of small tiles. Level 0 is the page
+    array itself; coarser levels are built on a background thread when the
+    page is set and the finer level stands in until they arrive.
+    """
+    TILE = 512
+    CACHE_TILES = 160  # Converted pixmaps kept across paints (<=1MB each)
+    level_ready = Signal()
+    _builder = ThreadPoolExecutor(max_workers=1)
+
+    def __init__(self):
+        super().__init__()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+        self.levels = []
+        self.tiles = OrderedDict()  # (level, tx, ty) -> QPixmap, least recently drawn first
+        self.generation = 0
+        self.edits = 0  # Bumped by every in-place patch, so a build can tell its source level changed
+        self.pending = False
+        self.lock = threading.Lock()
+        self.level_ready.connect(self.update)
+
+    def boundingRect(self):
+        if not self.levels: return QRectF()
+        return QRectF(0, 0, self.levels[0].shape[1], self.levels[0].shape[0])
+
+    def set_image(self, cv_img):
+        self.prepareGeometryChange()
+        with self.lock:
+            self.generation += 1
+            self.levels = [cv_img]
+            # Queued right away so the pyramid is usually done before the first zoom-out
+            self.pending = self.max_level() > 0
+            if self.pending:
+                ImageItem._builder.submit(self._build_levels, self.generation, self.max_level())
+        self.tiles.clear()
+        self.update()
+
+    def invalidate(self, x, y, w, h):
+        """Redraws a rect of the page after it was edited in place; the pyramid is patched, not rebuilt"""
+        if not self.levels: return
+        with self.lock:
+            if self.pending:
+                # A level being built may already hold the old pixels; restart from the edited page
+                self.generation += 1
+                self.levels = self.levels[:1]
+                ImageItem._builder.submit(self._build_levels, self.generation, self.max_level())
+            else:
+                self.edits += 1
+                for k in range(1, len(self.levels)):
+                    s = 2 ** k
+                    lh, lw = self.levels[k].shape[:2]
+                    x1, y1 = x // s, y // s
+                    x2, y2 = min(lw, -(-(x + w) // s)), min(lh, -(-(y + h) // s))
+                    self.levels[k][y1:y2, x1:x2] = ImageItem._half(self.levels[k - 1][y1*2:y2*2, x1*2:x2*2])
+
+        t = ImageItem.TILE
+        for level, tx, ty in list(self.tiles):
+            span = t * 2 ** level
+            if tx * span < x + w and x < (tx + 1) * span and ty * span < y + h and y < (ty + 1) * span:
+                del self.tiles[(level, tx, ty)]
+        self.update(QRectF(x, y, w, h))
+
+    def max_level(self):
+        if not self.levels: return 0
+        h, w = self.levels[0].shape[:2]
+        return max(0, math.ceil(math.log2(max(h, w) / ImageItem.TILE)))
+
+    def paint(self, painter, option, widget=None):
+        if not self.levels: return
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        wanted = min(self.max_level(), max(0, int(math.floor(math.log2(1 / lod)))) if lod > 0 else 0)
+        with self.lock:
+            level = min(wanted, len(self.levels) - 1)
+            if level < wanted and not self.pending:
+                self.pending = True
+                ImageItem._builder.submit(self._build_levels, self.generation, wanted)
+
+        t, scale = ImageItem.TILE, 2 ** level
+        h, w = self.levels[level].shape[:2]
+        r = option.exposedRect.intersected(self.boundingRect())
+        if r.isEmpty(): return
+        for ty in range(int(r.top() / scale) // t, min(h - 1, int(r.bottom() / scale)) // t + 1):
+            for tx in range(int(r.left() / scale) // t, min(w - 1, int(r.right() / scale)) // t + 1):
+                pix = self._tile(level, tx, ty)
+                painter.drawPixmap(QRectF(tx * t * scale, ty * t * scale, pix.width() * scale, pix.height() * scale),
+                                   pix, QRectF(pix.rect()))
+
+    def _tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        pix = self.tiles.get(key)
+        if pix is not None:
+            self.tiles.move_to_end(key)
+            return pix
+
+        t = ImageItem.TILE
+        tile = np.ascontiguousarray(self.levels[level][ty*t:(ty+1)*t, tx*t:(tx+1)*t])
+        h, w = tile.shape[:2]
+        fmt = QImage.Format_RGBA8888 if tile.ndim == 3 and tile.shape[2] == 4 else QImage.Format_RGB888
+        pix = self.tiles[key] = QPixmap.fromImage(QImage(tile.data, w, h, tile.strides[0], fmt))
+        if len(self.tiles) > ImageItem.CACHE_TILES:
+            self.tiles.popitem(last=False)
+        return pix
+
+    @staticmethod
+    def _half(img):
+        # Odd edges are replicated so every level pixel is the exact mean of a 2x2 block,
+        # which lets invalidate() recompute any aligned region bit-identically
+        h, w = img.shape[:2]
+        if h % 2 or w % 2:
+            img = cv2.copyMakeBorder(img, 0, h % 2, 0, w % 2, cv2.BORDER_REPLICATE)
+        return cv2.resize(img, ((w + 1) // 2, (h + 1) // 2), interpolation=cv2.INTER_AREA)
+
+    def _build_levels(self, generation, wanted):
+        # Each level halves the previous one, so the whole pyramid costs about a third of one resize of the page
+        # A superseded build leaves pending alone: the build of the newer generation is still queued
+        while True:
+            with self.lock:
+                if generation != self.generation: return
+                if len(self.levels) > wanted:
+                    self.pending = False
+                    break
+                prev, edits = self.levels[-1], self.edits
+            level = ImageItem._half(prev)
+            with self.lock:
+                if generation != self.generation: return
+                # prev was patched while it was being halved; halve it again
+                if edits != self.edits: continue
+                self.levels.append(level)
+        self.level_ready.emit()
+
+#/////////////////////////////////#
+#     TILED MASK OVERLAY ITEM     #
+#/////////////////////////////////#
+
+class MaskItem(QGraphicsItem):
+    """
+    Draws a MaskLayer as a grid of small pixmaps. An edit only drops the
+    tiles it overlaps and they are rebuilt the next time they are painted,
+    so a brush dab costs a few tiles instead of a full-page QPixmap upload.
+    """
+    TILE = 256
+
+    def __init__(self):
+        super().__init__()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)  # exposedRect is only set with this flag
+        self.mask = None
+        self.tiles = {}  # (tx, ty) -> QPixmap
+
+    def boundingRect(self):
+        if self.mask is None: return QRectF()
+        return QRectF(0, 0, self.mask.width(), self.mask.height())
+
+    def set_mask(self, mask):
+        """Shows a different (or recoloured) mask; every tile is rebuilt lazily"""
+        if self.mask is None or mask is None or (mask.width(), mask.height()) != (self.mask.width(), self.mask.height()):
+            self.prepareGeometryChange()
+        self.mask = mask
+        self.tiles.clear()
+        self.update()
+
+    def invalidate(self, x, y, w, h):
+        """Marks the pixels in the rect as changed"""
+        if self.mask is None: return
+        t = MaskItem.TILE
+        for ty in range(max(0, y // t), (min(y + h, self.mask.height()) - 1) // t + 1):
+            for tx in range(max(0, x // t), (min(x + w, self.mask.width()) - 1) // t + 1):
+                self.tiles.pop((tx, ty), None)
+        self.update(QRectF(x, y, w, h))
+
+    def paint(self, painter, option, widget=None):
+        if self.mask is None: return
+        t = MaskItem.TILE
+        r = option.exposedRect.intersected(self.boundingRect())
+        if r.isEmpty(): return
+        for ty in range(int(r.top()) // t, (int(r.bottom()) - 1) // t + 1):
+            for tx in range(int(r.left()) // t, (int(r.right()) - 1) // t + 1):
+                pix = self.tiles.get((tx, ty))
+                if pix is None:
+                    pix = self.tiles[(tx, ty)] = self._build_tile(tx, ty)
+                painter.drawPixmap(tx * t, ty * t, pix)
+
+    def _build_tile(self, tx, ty):
+        t = MaskItem.TILE
+        tile = np.ascontiguousarray(self.mask.data[ty*t:(ty+1)*t, tx*t:(tx+1)*t])
+        h, w = tile.shape
+        img = QImage(tile.data, w, h, w, QImage.Format_Indexed8)
+        img.setColorTable(MaskLayer._palette(self.mask.color))
+        # fromImage converts right away, so the temporary buffer may go after this
+        return QPixmap.fromImage(img)
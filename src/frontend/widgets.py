@@ -1,12 +1,15 @@
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import PySide6.QtSvg 
 from PySide6.QtWidgets import (QListWidget, QListWidgetItem, QWidget, QVBoxLayout, 
                              QPushButton, QLabel, QFrame, QSlider, QHBoxLayout,
                              QStyledItemDelegate)
-from PySide6.QtCore import Qt, QRect
+from PySide6.QtCore import Qt, QRect, QSize, QTimer, Signal
 from PySide6.QtGui import QIcon
 from src.utils.config import Config
 from src.utils.paths import Paths
+from src.utils.logger import logger
 
 #/////////////////////////////////#
 #    STUDIO COMPONENT LIBRARY     #
@@ -28,6 +31,10 @@ class FileListDelegate(QStyledItemDelegate):
         return self.icons[state_name]
 
     def paint(self, painter, option, index):
+        # 0. Only rows that actually get painted ask for their thumbnail / size
+        view = self.parent()
+        if isinstance(view, FileListWidget): view.request_meta(index.data(Qt.UserRole))
+
         # 1. Paint standard background, highlight, checkbox, and text
         super().paint(painter, option, index)
         
@@ -58,10 +65,32 @@ class FileListDelegate(QStyledItemDelegate):
                 lock_icon.paint(painter, rect, Qt.AlignCenter, QIcon.Normal, QIcon.On)
 
 class FileListWidget(QListWidget):
+    # path, thumbnail file (or None), index entry; emitted from the thumbnail thread
+    meta_ready = Signal(str, object, object)
+
     def __init__(self):
         super().__init__()
         self.setStyleSheet(f"background: {Config.COLOR_PANEL}; border: none;")
         self.setItemDelegate(FileListDelegate(self))
+        self.setIconSize(QSize(Config.THUMB_HEIGHT // 2, Config.THUMB_HEIGHT // 2))
+
+        self.items = {}  # path -> item
+        self.index = None  # FolderIndex of the open folder, if any
+        self.requested = set()
+        self.wanted = deque()  # Newest request is served first, so the rows in view win
+        self._meta_pool = ThreadPoolExecutor(max_workers=1)
+        self.meta_ready.connect(self._apply_meta)
+
+        # Thumbnails arrive in bursts; the index is written once things settle
+        self._save_timer = QTimer(self)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(2000)
+        self._save_timer.timeout.connect(lambda: self.index and self.index.save())
+
+    def set_index(self, index):
+        self.index = index
+        self.requested.clear()
+        self.wanted.clear()
 
     def add_file(self, full_path: str):
         item = QListWidgetItem(os.path.basename(full_path))
@@ -71,13 +100,57 @@ class FileListWidget(QListWidget):
         item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
         item.setCheckState(Qt.Unchecked)
         self.addItem(item)
+        self.items[full_path] = item
+
+    def add_files(self, paths):
+        self.setUpdatesEnabled(False)
+        for p in paths: self.add_file(p)
+        self.setUpdatesEnabled(True)
+
+    def clear(self):
+        if self.index: self.index.save()
+        super().clear()
+        self.items.clear()
+        self.set_index(None)
 
     def update_item_state(self, full_path: str, state_name: str):
-        for i in range(self.count()):
-            item = self.item(i)
-            if item.data(Qt.UserRole) == full_path:
-                item.setData(Qt.UserRole + 1, state_name)
-                break
+        item = self.items.get(full_path)
+        if item: item.setData(Qt.UserRole + 1, state_name)
+
+    #/////////////////////////////////#
+    #   LAZY THUMBNAILS & PAGE INFO   #
+    #/////////////////////////////////#
+
+    def request_meta(self, path):
+        if self.index is None or path in self.requested: return
+        self.requested.add(path)
+        self.wanted.append(path)
+        self._meta_pool.submit(self._load_meta, self.index)
+
+    def _load_meta(self, index):
+        # Runs on the thumbnail thread; requests for a folder that was closed meanwhile are dropped
+        if index is not self.index: return
+        try:
+            path = self.wanted.pop()
+        except IndexError:
+            return
+        try:
+            entry = index.info(path)
+            thumb = index.thumbnail(path)
+        except Exception as e:
+            logger.warning(f"Thumbnail failed for {os.path.basename(path)}: {e}")
+            return
+        self.meta_ready.emit(path, thumb, dict(entry or {}))
+
+    def _apply_meta(self, path, thumb, entry):
+        item = self.items.get(path)
+        if item is None: return
+        if thumb: item.setIcon(QIcon(thumb))
+        if entry.get("width"):
+            size_mb = entry["size"] / (1024 * 1024)
+            alpha = " | alpha" if entry["alpha"] else ""
+            item.setText(f"{os.path.basename(path)}\n{entry['width']}x{entry['height']} | {size_mb:.1f} MB{alpha}")
+        self._save_timer.start()
 
 class ToolGroup(QFrame):
     def __init__(self, title, button_configs):
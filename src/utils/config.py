@@ -20,8 +20,92 @@ class Config:
     
     DEFAULT_BRUSH_SIZE = 40
     MAX_HISTORY = 20
+    MASK_HISTORY_BUDGET_MB = 32  # Per page; mask undo keeps compressed dirty-rect deltas
+    # Image undo (one step per clean run); older steps are PNG-packed in the background
+    IMAGE_HISTORY_BUDGET_MB = 256
+    IMAGE_HISTORY_GLOBAL_MB = 1024
     DEFAULT_TILE_WIDTH = 1024 
 
+    # Webtoon strips (longer than OCR_WINDOW and OCR_TILE_ASPECT times longer than wide) are
+    # detected in overlapping windows; ordinary pages, even high-resolution ones, in one pass
+    OCR_WINDOW = 2048
+    OCR_WINDOW_OVERLAP = 256
+    OCR_TILE_ASPECT = 2.0
+    # Text-mask expansion runs as a distance transform over bands of this many rows
+    MASK_EXPAND_BAND = 2048
+
+    # Open page sessions (image + mask + history) kept in RAM; colder pages spill to cache/sessions
+    SESSION_RAM_BUDGET_MB = 2048
+
+    # Folder index: header bytes read per page, stored thumbnail height
+    HEADER_READ_BYTES = 65536
+    THUMB_HEIGHT = 96
+
+    # Decoded pages prefetched around the selected page / ahead of the GUI batch
+    PREFETCH_PAGES = 3
+    PREFETCH_THREADS = 2
+    PREFETCH_CACHE_MB = 768
+
+    # Staged batch pipeline (pages buffered between stages / decode threads)
+    PIPELINE_DEPTH = 2
+    PIPELINE_DECODE_THREADS = 2
+
+    # LaMa tiles of identical padded shape are stacked into one NCHW batch
+    LAMA_MAX_BATCH = 8
+    LAMA_BATCH_BUDGET_MB = 1024
+    # VRAM is the tighter limit: GPUs batch small tiles only, raise these on large cards
+    LAMA_MAX_BATCH_GPU = 2
+    LAMA_BATCH_BUDGET_MB_GPU = 512
+    # Approximate FP32 peak of LaMa's activations per input pixel (about 1GB for one 512x512 tile)
+    LAMA_ACTIVATION_BYTES_PER_PX = 4096
+    # Preallocated input / output tensors kept per tile shape (see TensorBuffers)
+    TENSOR_BUFFER_SLOTS = 12
+
+    # Inference worker processes (0 = auto: 1 on GPU, ~8 cores each on CPU)
+    INFERENCE_WORKERS = 0
+    MAX_AUTO_WORKERS = 4
+
+    # Warm ONNX sessions per process (0 = auto: a share of the RAM free at first load)
+    MODEL_CACHE_BUDGET_MB = 0
+    MODEL_CACHE_RAM_SHARE = 0.5
+    MODEL_CACHE_MIN_MB = 512
+
+    # Model precision: full = FP32 only, balanced = FP16 on GPU, fast = FP16 on GPU / INT8 on CPU
+    MODEL_QUALITY = "balanced"
+    # A variant is only auto-selected if its calibration against FP32 did not fail
+    VARIANT_MIN_PSNR = 32.0
+    VARIANT_MIN_IOU = 0.9
+    CALIBRATION_PAGES = 8
+
+    # Content-addressed OCR mask / LaMa tile results on disk (LRU trimmed)
+    RESULT_CACHE_ENABLED = True
+    RESULT_CACHE_MB = 2048
+
+    # ONNX Runtime session profile; keys in cache/ort_profile.json override these per machine
+    ORT_PROFILE = {
+        "graph_optimization": "all",     # disable | basic | extended | all
+        "intra_op_threads": 0,           # 0 = ONNX Runtime default (pool workers get their own slice)
+        "inter_op_threads": 0,
+        "execution_mode": "sequential",  # sequential | parallel
+        "mem_pattern": False,
+        "cpu_arena": True,
+        "cache_optimized_model": True,
+        "io_binding": True,              # LaMa writes its output straight into a reused buffer
+    }
+    _ORT_PROFILE_FILE = os.path.join(Paths.CACHE, "ort_profile.json")
+
+    # Adaptive ROI tiles: blob box + context margin, nearby blobs share a tile
+    TILE_CONTEXT_MARGIN = 64
+    TILE_MERGE_GAP = 64
+    TILE_MIN_SIZE = 128
+
+    # Mask components closer than REGION_GAP px, or inside one speech bubble, are cleaned as one region
+    REGION_GAP = 24
+    REGION_NOISE_AREA = 5  # Isolated specks up to this many px are ignored
+    BUBBLE_SCALE = 4  # Bubbles are found on a 1/BUBBLE_SCALE subsample of the page
+    BUBBLE_MIN_BRIGHTNESS = 200
+    BUBBLE_MAX_SHARE = 0.1  # Bright areas larger than this share of the page are background, not bubbles
+
     _ID_FILE = os.path.join(Paths.CACHE, "batch_id.json")
 
     @staticmethod
@@ -41,4 +125,15 @@ class Config:
         with open(Config._ID_FILE, 'w') as f:
             json.dump({"last_id": current_id}, f)
             
-        return f"batch_{current_id:05d}"
\ No newline at end of file
+        return f"batch_{current_id:05d}"
+
+    @staticmethod
+    def get_ort_profile():
+        profile = dict(Config.ORT_PROFILE)
+        if os.path.exists(Config._ORT_PROFILE_FILE):
+            try:
+                with open(Config._ORT_PROFILE_FILE, 'r') as f:
+                    profile.update({k: v for k, v in json.load(f).items() if k in profile})
+            except:
+                pass
+        return profile
\ No newline at end of file
@@ -1,52 +1,149 @@
+import threading
+import weakref
+import cv2
 import numpy as np
-from PySide6.QtGui import QImage
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.config import Config
 
 #/////////////////////////////////#
 #    4-STACK HISTORY MANAGER      #
 #/////////////////////////////////#
 
 class HistoryManager:
+    """
+    Image undo keeps one step per clean run: the (x, y, patch) list of all its
+    tiles. Steps that are no longer the newest are PNG-packed on a background
+    thread, and the oldest steps are dropped once a page or all pages together
+    exceed their byte budget. Mask undo keeps dirty-rect deltas.
+    """
+    _packer = ThreadPoolExecutor(max_workers=1)
+    _lock = threading.Lock()
+    _all = weakref.WeakSet()
+
     def __init__(self, limit=20):
         self.limit = limit
         self.img_undo = []
         self.img_redo = []
         self.mask_undo = []
         self.mask_redo = []
+        HistoryManager._all.add(self)
 
-    def push_image_action(self, x, y, patch):
-        self.img_undo.append((x, y, patch.copy()))
-        self.img_redo.clear()
-        if len(self.img_undo) > self.limit:
-            self.img_undo.pop(0)
+    def push_image_action(self, patches):
+        """Records the pre-edit patches of one clean run as a single undo step"""
+        if not patches: return
+        with HistoryManager._lock:
+            self.img_undo.append([(x, y, p.copy()) for x, y, p in patches])
+            self.img_redo.clear()
+            if len(self.img_undo) > self.limit:
+                self.img_undo.pop(0)
+            cold = self.img_undo[-2] if len(self.img_undo) > 1 else None
+        if cold is not None:
+            HistoryManager._packer.submit(self._pack_cold, cold)
+        self._enforce_budget()
 
     def pop_image_undo(self, current_img):
-        if not self.img_undo: return None
-        x, y, patch = self.img_undo.pop()
-        h, w = patch.shape[:2]
-        redo_patch = current_img[y:y+h, x:x+w].copy()
-        self.img_redo.append((x, y, redo_patch))
-        return (x, y, patch)
+        """Reverts the newest step inside current_img; returns the (x, y, w, h) it touched"""
+        return self._swap(current_img, self.img_undo, self.img_redo)
 
     def pop_image_redo(self, current_img):
-        if not self.img_redo: return None
-        x, y, patch = self.img_redo.pop()
-        h, w = patch.shape[:2]
-        undo_patch = current_img[y:y+h, x:x+w].copy()
-        self.img_undo.append((x, y, undo_patch))
-        return (x, y, patch)
-
-    def push_mask_state(self, mask_qimage):
-        self.mask_undo.append(mask_qimage.copy())
+        return self._swap(current_img, self.img_redo, self.img_undo)
+
+    def _swap(self, current_img, source, target):
+        with HistoryManager._lock:
+            if not source: return None
+            step = source.pop()
+        # Patches can overlap, so they are written back newest first; the
+        # inverse step is captured in that order and replays correctly reversed
+        inverse = []
+        for x, y, patch in reversed([HistoryManager.unpack(e) for e in step]):
+            h, w = patch.shape[:2]
+            inverse.append((x, y, current_img[y:y+h, x:x+w].copy()))
+            current_img[y:y+h, x:x+w] = patch
+        with HistoryManager._lock:
+            target.append(inverse)
+
+        x1, y1 = min(e[0] for e in inverse), min(e[1] for e in inverse)
+        x2 = max(e[0] + e[2].shape[1] for e in inverse)
+        y2 = max(e[1] + e[2].shape[0] for e in inverse)
+        return x1, y1, x2 - x1, y2 - y1
+
+    #/////////////////////////////////#
+    #  PATCH PACKING & BYTE BUDGETS   #
+    #/////////////////////////////////#
+
+    @staticmethod
+    def pack(entry):
+        """(x, y, ndarray) -> (x, y, PNG bytes); packed entries pass through"""
+        x, y, patch = entry
+        if isinstance(patch, bytes): return entry
+        return (x, y, cv2.imencode(".png", patch, [cv2.IMWRITE_PNG_COMPRESSION, 1])[1].tobytes())
+
+    @staticmethod
+    def unpack(entry):
+        x, y, patch = entry
+        if not isinstance(patch, bytes): return entry
+        return (x, y, cv2.imdecode(np.frombuffer(patch, np.uint8), cv2.IMREAD_UNCHANGED))
+
+    def _pack_cold(self, step):
+        packed = [HistoryManager.pack(e) for e in step]
+        with HistoryManager._lock:
+            # The step may have been undone meanwhile; packing it in place is still lossless
+            step[:] = packed
+        self._enforce_budget()
+
+    @staticmethod
+    def _entry_bytes(entry):
+        patch = entry[2]
+        return len(patch) if isinstance(patch, bytes) else patch.nbytes
+
+    def image_bytes(self):
+        with HistoryManager._lock:
+            return self._image_bytes()
+
+    def _image_bytes(self):
+        return sum(HistoryManager._entry_bytes(e) for step in self.img_undo + self.img_redo for e in step)
+
+    def _enforce_budget(self):
+        # Checked and trimmed under one lock: the packer thread and undo / redo move steps concurrently
+        page_budget = Config.IMAGE_HISTORY_BUDGET_MB * 1024 * 1024
+        global_budget = Config.IMAGE_HISTORY_GLOBAL_MB * 1024 * 1024
+        with HistoryManager._lock:
+            while len(self.img_undo) > 1 and self._image_bytes() > page_budget:
+                self.img_undo.pop(0)
+
+            # Across pages the oldest step of the heaviest page goes first
+            managers = list(HistoryManager._all)
+            sizes = {m: m._image_bytes() for m in managers}
+            while sum(sizes.values()) > global_budget:
+                candidates = [m for m in managers if len(m.img_undo) > 1]
+                if not candidates: break
+                heaviest = max(candidates, key=sizes.get)
+                heaviest.img_undo.pop(0)
+                sizes[heaviest] = heaviest._image_bytes()
+
+    def push_mask_delta(self, delta):
+        """Mask history holds dirty-rect deltas and is capped by bytes instead of steps"""
+        self.mask_undo.append(delta)
         self.mask_redo.clear()
-        if len(self.mask_undo) > self.limit:
+        budget = Config.MASK_HISTORY_BUDGET_MB * 1024 * 1024
+        while len(self.mask_undo) > 1 and self._mask_bytes() > budget:
             self.mask_undo.pop(0)
 
-    def pop_mask_undo(self, current_mask):
+    def pop_mask_undo(self):
         if not self.mask_undo: return None
-        self.mask_redo.append(current_mask.copy())
-        return self.mask_undo.pop()
+        delta = self.mask_undo.pop()
+        self.mask_redo.append(delta)
+        return delta
 
-    def pop_mask_redo(self, current_mask):
+    def pop_mask_redo(self):
         if not self.mask_redo: return None
-        self.mask_undo.append(current_mask.copy())
-        return self.mask_redo.pop()
\ No newline at end of file
+        delta = self.mask_redo.pop()
+        self.mask_undo.append(delta)
+        return delta
+
+    def _mask_bytes(self):
+        return sum(len(d[4]) + len(d[5]) for delta in self.mask_undo + self.mask_redo for d in delta)
+
+    def nbytes(self):
+        """RAM held by all four stacks"""
+        return self.image_bytes() + self._mask_bytes()
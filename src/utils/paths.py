@@ -15,13 +15,23 @@ class Paths:
     LOGS = os.path.join(BASE_DIR, "logs")
     CACHE = os.path.join(BASE_DIR, "cache")
     PROCESSED = os.path.join(BASE_DIR, "processed")
+    ORT_CACHE = os.path.join(CACHE, "ort")
+    RESULT_CACHE = os.path.join(CACHE, "results")
+    SESSIONS = os.path.join(CACHE, "sessions")
+    FOLDER_INDEX = os.path.join(CACHE, "index")
 
     @staticmethod
     def initialize():
-        for p in [Paths.MODELS, Paths.LOGS, Paths.CACHE, Paths.PROCESSED]:
+        for p in [Paths.MODELS, Paths.LOGS, Paths.CACHE, Paths.PROCESSED, Paths.ORT_CACHE, Paths.RESULT_CACHE, Paths.FOLDER_INDEX]:
             if not os.path.exists(p):
                 os.makedirs(p)
 
     @staticmethod
     def get_model(name):
-        return os.path.join(Paths.MODELS, name)
\ No newline at end of file
+        return os.path.join(Paths.MODELS, name)
+
+    @staticmethod
+    def get_model_variant(name, variant):
+        """ocr.onnx + int8 -> models/ocr.int8.onnx (variants ship next to the originals)"""
+        stem, ext = os.path.splitext(name)
+        return os.path.join(Paths.MODELS, f"{stem}.{variant}{ext}")
\ No newline at end of file
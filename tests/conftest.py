@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the app as `src.*` from the repository root and never open a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
@@ -0,0 +1,98 @@
+import threading
+import numpy as np
+import pytest
+from src.backend.batch_pipeline import BatchPipeline
+
+class Stages:
+    """Fake stage callables: pages are tiny arrays tagged with their index"""
+    def __init__(self, fail=None):
+        self.fail = fail or {}  # stage name -> page paths that raise there
+        self.saved = []
+        self.cleaned = []
+        self.lock = threading.Lock()
+
+    def _check(self, stage, path):
+        if path in self.fail.get(stage, ()):
+            raise RuntimeError(f"{stage} failed on {path}")
+
+    def load(self, path):
+        self._check("load", path)
+        if path in self.fail.get("decode", ()): return None
+        return np.full((4, 4, 3), int(path[1:]), dtype=np.uint8)
+
+    def scan(self, img):
+        self._check("scan", f"p{img[0, 0, 0]}")
+        # Odd pages have no text
+        return np.full((4, 4), 255 * (img[0, 0, 0] % 2 == 0), dtype=np.uint8)
+
+    def clean(self, img, mask):
+        self._check("clean", f"p{img[0, 0, 0]}")
+        with self.lock: self.cleaned.append(f"p{img[0, 0, 0]}")
+        return img + 100
+
+    def save(self, path, img):
+        self._check("save", path)
+        with self.lock: self.saved.append((path, int(img[0, 0, 0])))
+
+def run(stages, files, **kwargs):
+    pipeline = BatchPipeline(stages.load, stages.scan, stages.clean, stages.save, **kwargs)
+    reported = []
+    pipeline.page_done = lambda path, error: reported.append((path, error))
+    before = set(threading.enumerate())
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(done=pipeline.run(files)))
+    runner.start()
+    runner.join(timeout=30)
+    assert not runner.is_alive(), "pipeline did not shut down"
+    # Every stage and decode thread has exited once run() returns
+    assert set(threading.enumerate()) - before - {runner} == set()
+    return pipeline, result["done"], reported
+
+FILES = [f"p{i}" for i in range(12)]
+
+def test_pages_flow_through_in_order():
+    stages = Stages()
+    pipeline, done, reported = run(stages, FILES, depth=1, decode_threads=3)
+    assert done == pipeline.completed == 12 and pipeline.failed == []
+    assert [p for p, _ in stages.saved] == FILES
+    assert [p for p, _ in reported] == FILES and all(e is None for _, e in reported)
+    # Only pages with text go through the clean stage
+    assert sorted(stages.cleaned, key=lambda p: int(p[1:])) == FILES[::2]
+    assert all(v == int(p[1:]) + (100 if int(p[1:]) % 2 == 0 else 0) for p, v in stages.saved)
+
+@pytest.mark.parametrize("lanes", [2, 4])
+def test_parallel_lanes_finish_every_page(lanes):
+    stages = Stages()
+    pipeline, done, reported = run(stages, FILES * 3, depth=1, lanes=lanes)
+    assert done == 36 and pipeline.failed == []
+    assert sorted(p for p, _ in stages.saved) == sorted(FILES * 3)
+
+@pytest.mark.parametrize("stage", ["load", "decode", "scan", "clean", "save"])
+def test_stage_errors_reach_the_result(stage):
+    stages = Stages(fail={stage: ["p2", "p8"]})
+    pipeline, done, reported = run(stages, FILES, lanes=2)
+    assert sorted(pipeline.failed) == ["p2", "p8"]
+    assert done == pipeline.completed == 10
+    errors = {p: e for p, e in reported}
+    assert len(errors) == 12
+    assert errors["p2"] is not None and errors["p8"] is not None
+    assert sum(e is None for e in errors.values()) == 10
+    assert "p2" not in [p for p, _ in stages.saved]
+
+def test_empty_batch():
+    pipeline, done, reported = run(Stages(), [])
+    assert done == 0 and pipeline.failed == [] and reported == []
+
+def test_cli_exit_code_follows_failures(monkeypatch):
+    import src.backend.headless as headless
+    from src.cli import run_cli
+
+    class FakeBatch:
+        failed = []
+        def __init__(self, *args): pass
+        def run(self): pass
+
+    monkeypatch.setattr(headless, "HeadlessBatch", FakeBatch)
+    assert run_cli(["batch", "in", "out"]) == 0
+    FakeBatch.failed = ["p2"]
+    assert run_cli(["batch", "in", "out"]) == 1
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+from src.frontend.canvas import MangaCanvas
+from src.frontend.mask_layer import MaskLayer
+
+@pytest.fixture(scope="module")
+def canvas():
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    view = MangaCanvas()
+    view.set_image(np.full((600, 400, 3), 200, dtype=np.uint8))
+    yield view
+    view.deleteLater()
+    app.processEvents()
+
+def test_undoing_a_scan_restores_its_tint(canvas):
+    ocr = np.zeros((600, 400), dtype=np.uint8)
+    ocr[100:200, 50:300] = 255
+    canvas.replace_mask(ocr, MaskLayer.RED)
+    alpha = np.zeros_like(ocr)
+    alpha[300:500, 100:200] = 255
+    delta = canvas.replace_mask(alpha, MaskLayer.GREEN)
+
+    canvas.mask_item.tiles[(0, 0)] = "stale"
+    canvas.apply_mask_delta(delta, undo=True)
+    assert canvas.mask.color == MaskLayer.RED
+    assert np.array_equal(canvas.mask.data, ocr)
+    # A tint change rebuilds every tile instead of a dirty rect
+    assert not canvas.mask_item.tiles
+
+    canvas.apply_mask_delta(delta, undo=False)
+    assert canvas.mask.color == MaskLayer.GREEN
+    assert np.array_equal(canvas.mask.data, alpha)
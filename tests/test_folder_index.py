@@ -0,0 +1,79 @@
+import os
+import threading
+import cv2
+import numpy as np
+import pytest
+from src.backend.folder_index import FolderIndex
+from src.utils.paths import Paths
+
+@pytest.fixture
+def chapter(tmp_path, monkeypatch):
+    monkeypatch.setattr(Paths, "FOLDER_INDEX", str(tmp_path / "index"))
+    folder = tmp_path / "chapter"
+    folder.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(12):
+        cv2.imwrite(str(folder / f"p{i:02}.png"), rng.integers(0, 255, (300, 200, 3), dtype=np.uint8))
+    (folder / "notes.txt").write_text("x")
+    return str(folder)
+
+def test_scan_and_info(chapter):
+    index = FolderIndex(chapter)
+    pages = index.scan()
+    assert [os.path.basename(p) for p in pages] == [f"p{i:02}.png" for i in range(12)]
+    info = index.info(pages[0])
+    assert (info["width"], info["height"], info["channels"]) == (200, 300, 3)
+
+def test_index_survives_a_reload(chapter):
+    index = FolderIndex(chapter)
+    pages = index.scan()
+    thumb = index.thumbnail(pages[3])
+    index.save()
+
+    again = FolderIndex(chapter)
+    assert again.scan() == pages
+    assert again.entries[os.path.basename(pages[3])]["hash"] == index.entries[os.path.basename(pages[3])]["hash"]
+    assert again.thumbnail(pages[3]) == thumb
+
+def test_changed_page_is_reset(chapter):
+    index = FolderIndex(chapter)
+    pages = index.scan()
+    index.thumbnail(pages[0])
+    cv2.imwrite(pages[0], np.zeros((50, 60, 3), dtype=np.uint8))
+    index.scan()
+    assert "hash" not in index.entries[os.path.basename(pages[0])]
+    assert index.info(pages[0])["width"] == 60
+
+def test_save_prunes_thumbnails_of_removed_pages(chapter):
+    index = FolderIndex(chapter)
+    pages = index.scan()
+    for p in pages: index.thumbnail(p)
+    index.save()
+    for p in pages[:5]: os.remove(p)
+    index.scan()
+    index.save()
+    assert len(os.listdir(index.thumb_dir)) == 7
+
+def test_save_while_thumbnails_are_made(chapter):
+    index = FolderIndex(chapter)
+    pages = index.scan()
+    errors, done = [], threading.Event()
+
+    def saver():
+        while not done.is_set():
+            try:
+                index.dirty = True
+                index.save()
+            except Exception as e:
+                errors.append(e)
+                return
+
+    t = threading.Thread(target=saver)
+    t.start()
+    thumbs = [index.thumbnail(p) for p in pages]
+    done.set()
+    t.join()
+    index.dirty = True
+    index.save()
+    assert not errors
+    assert all(os.path.exists(p) for p in thumbs)
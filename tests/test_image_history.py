@@ -0,0 +1,92 @@
+import gc
+import threading
+import numpy as np
+import pytest
+from src.utils.config import Config
+from src.utils.history import HistoryManager
+
+def settle():
+    """Waits for the background packing of cold steps"""
+    HistoryManager._packer.submit(lambda: None).result()
+
+def noise(h, w, c=3, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (h, w, c), dtype=np.uint8)
+
+@pytest.mark.parametrize("channels", [3, 4])
+def test_pack_unpack_is_lossless(channels):
+    entry = (12, 34, noise(50, 70, channels))
+    packed = HistoryManager.pack(entry)
+    assert isinstance(packed[2], bytes)
+    assert HistoryManager.pack(packed) is packed
+    x, y, patch = HistoryManager.unpack(packed)
+    assert (x, y) == (12, 34)
+    assert np.array_equal(patch, entry[2])
+
+def test_clean_run_undoes_and_redoes_as_one_step():
+    page = noise(400, 400, seed=1)
+    original = page.copy()
+    history = HistoryManager()
+
+    # Two overlapping tiles of one clean run
+    patches = [(50, 50, page[50:250, 50:250].copy()), (150, 100, page[100:300, 150:350].copy())]
+    page[50:250, 50:250] = 10
+    page[100:300, 150:350] = 20
+    cleaned = page.copy()
+    history.push_image_action(patches)
+    # A second run makes the first step cold, so it is undone from its packed form
+    history.push_image_action([(0, 0, page[0:20, 0:20].copy())])
+    page[0:20, 0:20] = 30
+    settle()
+
+    history.pop_image_undo(page)
+    assert history.pop_image_undo(page) == (50, 50, 300, 250)
+    assert np.array_equal(page, original)
+    history.pop_image_redo(page)
+    assert np.array_equal(page, cleaned)
+    assert history.pop_image_redo(page) is not None
+    assert history.pop_image_redo(page) is None
+
+def test_page_budget_drops_oldest_steps(monkeypatch):
+    monkeypatch.setattr(Config, "IMAGE_HISTORY_BUDGET_MB", 1)
+    history = HistoryManager()
+    for i in range(10):
+        # Noise keeps its size when packed: about 300KB per step
+        history.push_image_action([(0, 0, noise(320, 320, seed=i))])
+    settle()
+    assert 1 <= len(history.img_undo) < 10
+    assert history.image_bytes() <= 1024 * 1024
+
+def test_global_budget_spans_pages(monkeypatch):
+    gc.collect()
+    monkeypatch.setattr(Config, "IMAGE_HISTORY_GLOBAL_MB", 1)
+    pages = [HistoryManager() for _ in range(3)]
+    for i in range(4):
+        for j, history in enumerate(pages):
+            history.push_image_action([(0, 0, noise(256, 256, seed=10 * i + j))])
+    settle()
+    pages[0]._enforce_budget()
+    assert sum(h.image_bytes() for h in pages) <= 1024 * 1024
+    assert all(len(h.img_undo) >= 1 for h in pages)
+
+def test_budget_trim_races_with_undo_and_packing(monkeypatch):
+    monkeypatch.setattr(Config, "IMAGE_HISTORY_BUDGET_MB", 1)
+    history = HistoryManager()
+    page = noise(300, 300, seed=3)
+    errors = []
+
+    def pusher():
+        try:
+            for i in range(150):
+                history.push_image_action([(0, 0, noise(300, 300, seed=i))])
+        except Exception as e:
+            errors.append(e)
+
+    t = threading.Thread(target=pusher)
+    t.start()
+    while t.is_alive():
+        history.pop_image_undo(page)
+        history.pop_image_redo(page)
+    t.join()
+    settle()
+    assert not errors
+    assert history.image_bytes() <= 1024 * 1024 or len(history.img_undo) <= 1
@@ -0,0 +1,85 @@
+import threading
+import numpy as np
+import pytest
+
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+from src.frontend.tile_items import ImageItem
+
+@pytest.fixture(scope="module", autouse=True)
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+def settle():
+    ImageItem._builder.submit(lambda: None).result()
+
+def page(h=3001, w=1203, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+def pyramid(img, levels):
+    out = [img]
+    for _ in range(levels):
+        out.append(ImageItem._half(out[-1]))
+    return out
+
+def assert_matches_rebuild(item):
+    expected = pyramid(item.levels[0], item.max_level())
+    assert len(item.levels) == len(expected)
+    for got, want in zip(item.levels, expected):
+        assert np.array_equal(got, want)
+
+def test_levels_are_built_in_the_background():
+    item = ImageItem()
+    item.set_image(page())
+    settle()
+    assert not item.pending
+    assert_matches_rebuild(item)
+
+def test_invalidate_patches_match_a_rebuild():
+    item = ImageItem()
+    img = page()
+    item.set_image(img)
+    settle()
+    for x, y, w, h in [(0, 0, 1, 1), (511, 1023, 300, 777), (1100, 2900, 103, 101)]:
+        img[y:y+h, x:x+w] = 7
+        item.invalidate(x, y, w, h)
+    assert_matches_rebuild(item)
+
+def test_superseded_build_keeps_the_newer_build_pending():
+    item = ImageItem()
+    item.set_image(page())
+    settle()
+    old = item.generation
+    # Holds the builder so the new page's build is still queued
+    gate = threading.Event()
+    ImageItem._builder.submit(gate.wait)
+    item.set_image(page(seed=1))
+    # A build of the replaced page finishing late must not clear pending for the new one
+    item._build_levels(old, item.max_level())
+    assert item.pending
+    gate.set()
+    settle()
+    assert not item.pending
+    assert_matches_rebuild(item)
+
+def test_build_halves_again_after_an_in_place_patch(monkeypatch):
+    item = ImageItem()
+    img = page()
+    item.set_image(img)
+    settle()
+    item.levels = item.levels[:1]
+    item.pending = False
+    half, patched = ImageItem._half, []
+
+    def half_then_patch(src):
+        result = half(src)
+        if not patched:
+            # The page is edited while its first level is being halved
+            patched.append(True)
+            img[100:400, 200:600] = 0
+            item.invalidate(200, 100, 400, 300)
+        return result
+
+    monkeypatch.setattr(ImageItem, "_half", staticmethod(half_then_patch))
+    item._build_levels(item.generation, item.max_level())
+    monkeypatch.setattr(ImageItem, "_half", staticmethod(half))
+    assert_matches_rebuild(item)
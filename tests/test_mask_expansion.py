@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+import pytest
+from src.backend.processor import ImageProcessor
+from src.utils.config import Config
+
+def text_mask(seed, h=900, w=700):
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    for _ in range(60):
+        x, y = rng.integers(0, w - 30), rng.integers(0, h - 12)
+        mask[y:y + rng.integers(2, 12), x:x + rng.integers(2, 30)] = 255
+    return mask
+
+def iou(a, b):
+    a, b = a > 0, b > 0
+    return (a & b).sum() / (a | b).sum()
+
+@pytest.mark.parametrize("radius", [5, 10, 28])
+def test_matches_disk_dilation(radius):
+    mask = text_mask(radius)
+    disk = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * radius + 1, 2 * radius + 1))
+    grown = ImageProcessor._expand_mask(mask, radius)
+    assert set(np.unique(grown)) <= {0, 255}
+    assert (grown[mask > 0] == 255).all()
+    assert iou(grown, cv2.dilate(mask, disk)) > 0.97
+
+def test_close_to_the_two_dilations_it_replaced():
+    mask = text_mask(0)
+    k_size = max(11, int(mask.shape[1] * 0.04)) | 1
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (k_size, k_size))
+    old = cv2.dilate(mask, kernel, iterations=2)
+    assert iou(ImageProcessor._expand_mask(mask, 2 * (k_size // 2)), old) > 0.97
+
+def test_bands_do_not_change_the_result(monkeypatch):
+    mask = text_mask(3, h=2000)
+    whole = ImageProcessor._expand_mask(mask, 20)
+    monkeypatch.setattr(Config, "MASK_EXPAND_BAND", 64)
+    assert np.array_equal(ImageProcessor._expand_mask(mask, 20), whole)
+
+def test_empty_mask_stays_empty():
+    assert not ImageProcessor._expand_mask(np.zeros((50, 40), dtype=np.uint8), 10).any()
@@ -0,0 +1,100 @@
+import numpy as np
+from src.frontend.mask_layer import MaskLayer
+from src.utils.config import Config
+from src.utils.history import HistoryManager
+
+def stroke(mask, x1, y1, x2, y2, value=255):
+    mask.touch(x1, y1, x2, y2)
+    mask.data[y1:y2, x1:x2] = value
+
+def test_edit_delta_round_trip():
+    mask = MaskLayer(700, 500)
+    mask.data[100:200, 100:200] = 255
+    before = mask.data.copy()
+
+    mask.begin_edit()
+    stroke(mask, 150, 150, 400, 260)
+    stroke(mask, 600, 10, 700, 40, 0)
+    stroke(mask, 20, 400, 90, 480)
+    after = mask.data.copy()
+    delta = mask.end_edit()
+
+    assert mask.apply(delta, undo=True) is not None
+    assert np.array_equal(mask.data, before)
+    mask.apply(delta, undo=False)
+    assert np.array_equal(mask.data, after)
+
+def test_delta_only_covers_edited_tiles():
+    mask = MaskLayer(2048, 2048)
+    mask.begin_edit()
+    stroke(mask, 10, 10, 30, 30)
+    delta = mask.end_edit()
+    x, y, w, h = mask.apply(delta, undo=True)
+    assert w <= MaskLayer.EDIT_TILE and h <= MaskLayer.EDIT_TILE
+
+def test_unchanged_edit_has_no_delta():
+    mask = MaskLayer(300, 300)
+    mask.begin_edit()
+    # Erasing where nothing is painted leaves every pixel as it was
+    stroke(mask, 0, 0, 100, 100, 0)
+    assert mask.end_edit() is None
+
+def test_replace_delta_round_trip():
+    mask = MaskLayer(400, 300)
+    mask.data[10:50, 10:50] = 255
+    before = mask.data.copy()
+    scan = np.zeros_like(mask.data)
+    scan[200:260, 300:380] = 255
+
+    delta = mask.replace(scan)
+    assert np.array_equal(mask.data, scan)
+    assert mask.apply(delta, undo=True) == (10, 10, 370, 250)
+    assert np.array_equal(mask.data, before)
+    assert mask.replace(before.copy()) is None
+
+def test_mask_history_stays_within_budget(monkeypatch):
+    monkeypatch.setattr(Config, "MASK_HISTORY_BUDGET_MB", 1)
+    rng = np.random.default_rng(0)
+    history = HistoryManager()
+    mask = MaskLayer(512, 512)
+    for _ in range(12):
+        # Noise does not compress, so every step costs about 2 x 256KB
+        delta = mask.replace(rng.integers(0, 255, (512, 512), dtype=np.uint8))
+        history.push_mask_delta(delta)
+
+    assert 1 <= len(history.mask_undo) < 12
+    assert history._mask_bytes() <= 1024 * 1024
+
+def test_mask_undo_redo_stacks():
+    history = HistoryManager()
+    mask = MaskLayer(64, 64)
+    first = mask.replace(np.full((64, 64), 255, dtype=np.uint8))
+    history.push_mask_delta(first)
+    assert history.pop_mask_undo() is first
+    assert history.pop_mask_undo() is None
+    assert history.pop_mask_redo() is first
+
+def test_replace_records_the_tint():
+    mask = MaskLayer(200, 100)
+    ocr = np.zeros_like(mask.data)
+    ocr[10:40, 10:90] = 255
+    mask.replace(ocr, MaskLayer.RED)
+    alpha = np.zeros_like(mask.data)
+    alpha[50:90, 100:190] = 255
+    delta = mask.replace(alpha, MaskLayer.GREEN)
+    assert mask.color == MaskLayer.GREEN
+
+    mask.apply(delta, undo=True)
+    assert mask.color == MaskLayer.RED and np.array_equal(mask.data, ocr)
+    mask.apply(delta, undo=False)
+    assert mask.color == MaskLayer.GREEN and np.array_equal(mask.data, alpha)
+
+def test_tint_only_change_is_undoable():
+    mask = MaskLayer(50, 50)
+    mask.data[5:10, 5:10] = 255
+    before = mask.data.copy()
+    delta = mask.replace(before.copy(), MaskLayer.GREEN)
+    assert delta is not None and mask.color == MaskLayer.GREEN
+    mask.apply(delta, undo=True)
+    assert mask.color == MaskLayer.RED and np.array_equal(mask.data, before)
+    assert mask.replace(before.copy(), MaskLayer.RED) is None
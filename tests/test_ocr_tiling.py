@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from src.backend.processor import ImageProcessor
+from src.utils.config import Config
+
+class PixelEngine:
+    """Stub OCR engine whose heatmap is the red channel, so every pixel is independent of its window"""
+    def __init__(self):
+        self.windows = []
+
+    def run(self, inp):
+        self.windows.append(inp.shape[2:])
+        return [inp[:, :1].copy()]
+
+def strip(h, w, seed):
+    # Values well clear of the 0.3 threshold, so cross-fading identical heatmaps cannot flip a pixel
+    rng = np.random.default_rng(seed)
+    rgb = rng.choice(np.array([0, 40, 200, 255], dtype=np.uint8), size=(h, w, 3))
+    rgb[h // 3:h // 3 + 50, :, 0] = 255  # a text band crossing window seams
+    return rgb
+
+@pytest.mark.parametrize("shape", [(5000, 300), (300, 5000), (Config.OCR_WINDOW + 33, 97), (61, 2 * Config.OCR_WINDOW + 5)])
+def test_tiled_mask_matches_one_shot(shape):
+    rgb = strip(*shape, seed=sum(shape))
+    engine = PixelEngine()
+    tiled = ImageProcessor._ocr_tiled_mask(engine, rgb)
+    assert len(engine.windows) > 1
+    assert max(max(w) for w in engine.windows) <= Config.OCR_WINDOW
+
+    one_shot = (ImageProcessor._ocr_heatmap(PixelEngine(), rgb) > 0.3) * np.uint8(255)
+    assert tiled.dtype == np.uint8 and tiled.shape == rgb.shape[:2]
+    np.testing.assert_array_equal(tiled, one_shot)
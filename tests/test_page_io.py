@@ -0,0 +1,76 @@
+import os
+import struct
+import zlib
+import cv2
+import numpy as np
+import pytest
+from src.backend.page_io import PageIO
+
+def write(tmp_path, name, img, params=()):
+    path = tmp_path / name
+    ok, buf = cv2.imencode(path.suffix, img, list(params))
+    assert ok
+    buf.tofile(str(path))
+    return str(path)
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def hand_png(tmp_path, color_type, extra=b""):
+    """1x1 page written by hand: OpenCV cannot emit palette or tRNS PNGs"""
+    ihdr = struct.pack(">IIBBBBB", 1, 1, 8, color_type, 0, 0, 0)
+    raw = b"\x00" + {0: b"\x00", 2: b"\x00\x00\x00", 3: b"\x00"}[color_type]
+    data = (b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", ihdr) + extra +
+            png_chunk(b"IDAT", zlib.compress(raw)) + png_chunk(b"IEND", b""))
+    path = tmp_path / f"hand_{color_type}_{len(extra)}.png"
+    path.write_bytes(data)
+    return str(path)
+
+PAGES = [
+    ("rgb.png", 3, ()),
+    ("rgba.png", 4, ()),
+    ("gray.png", 1, ()),
+    ("baseline.jpg", 3, (cv2.IMWRITE_JPEG_QUALITY, 90)),
+    ("progressive.jpg", 3, (cv2.IMWRITE_JPEG_PROGRESSIVE, 1)),
+    ("lossy.webp", 3, (cv2.IMWRITE_WEBP_QUALITY, 80)),
+    ("lossy_alpha.webp", 4, (cv2.IMWRITE_WEBP_QUALITY, 80)),
+    ("lossless.webp", 3, (cv2.IMWRITE_WEBP_QUALITY, 101)),
+    ("lossless_alpha.webp", 4, (cv2.IMWRITE_WEBP_QUALITY, 101)),
+]
+
+@pytest.mark.parametrize("name, channels, params", PAGES)
+def test_header_matches_decoded_page(tmp_path, name, channels, params):
+    shape = (173, 291) if channels == 1 else (173, 291, channels)
+    img = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    if channels == 4: img[..., 3] = 128
+    path = write(tmp_path, name, img, params)
+
+    header = PageIO.read_header(path)
+    decoded = PageIO.load(path)
+    assert (header["height"], header["width"]) == decoded.shape[:2] == (173, 291)
+    assert header["channels"] == decoded.shape[2]
+    assert header["alpha"] == (decoded.shape[2] == 4)
+
+def test_png_alpha_from_trns_chunk(tmp_path):
+    plain = hand_png(tmp_path, 2)
+    keyed = hand_png(tmp_path, 2, png_chunk(b"tRNS", b"\x00\x00\x00\x00\x00\x00"))
+    palette = hand_png(tmp_path, 3, png_chunk(b"PLTE", b"\x00\x00\x00") + png_chunk(b"tRNS", b"\x00"))
+    assert PageIO.read_header(plain)["alpha"] is False
+    assert PageIO.read_header(keyed)["alpha"] is True
+    assert PageIO.read_header(palette)["alpha"] is True
+    assert PageIO.load(palette).shape == (1, 1, 4)
+
+def test_unknown_or_truncated_files(tmp_path):
+    junk = tmp_path / "junk.png"
+    junk.write_bytes(b"not an image at all")
+    cut = tmp_path / "cut.jpg"
+    cut.write_bytes(b"\xff\xd8\xff\xe0\x00\x10JFIF")
+    assert PageIO.read_header(str(junk)) is None
+    assert PageIO.read_header(str(cut)) is None
+    assert PageIO.read_header(str(tmp_path / "missing.png")) is None
+
+def test_list_pages_sorted_images_only(tmp_path):
+    for name in ["b.PNG", "a.jpg", "c.webp", "notes.txt"]:
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "dir.png").mkdir()
+    assert [os.path.basename(p) for p in PageIO.list_pages(str(tmp_path))] == ["a.jpg", "b.PNG", "c.webp"]
@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+from src.backend.region_analyzer import RegionAnalyzer
+from src.utils.config import Config
+
+def boxes(regions):
+    return sorted(r["box"] for r in regions)
+
+def test_components_within_the_gap_form_one_region():
+    mask = np.zeros((400, 600), dtype=np.uint8)
+    mask[100:120, 100:160] = 255
+    mask[100:120, 160 + Config.REGION_GAP:220 + Config.REGION_GAP] = 255
+    mask[300:320, 400:460] = 255
+    regions, stats = RegionAnalyzer.analyze(mask)
+    assert boxes(regions) == [(100, 100, 220 + Config.REGION_GAP, 120), (400, 300, 460, 320)]
+    assert stats["components"] == 3 and stats["regions"] == 2
+
+def test_isolated_specks_are_dropped_as_noise():
+    mask = np.zeros((400, 400), dtype=np.uint8)
+    mask[50:70, 50:90] = 255
+    mask[300, 300] = mask[301, 300] = 255
+    regions, stats = RegionAnalyzer.analyze(mask)
+    assert boxes(regions) == [(50, 50, 90, 70)]
+    assert stats["noise"] == 1
+
+def test_regions_are_sorted_by_priority():
+    mask = np.zeros((500, 500), dtype=np.uint8)
+    mask[10:20, 10:20] = 255
+    mask[200:300, 200:300] = 255
+    mask[400:440, 400:440] = 255
+    regions, _ = RegionAnalyzer.analyze(mask)
+    assert [r["area"] for r in regions] == [10000, 1600, 100]
+    assert all(r["priority"] == r["area"] for r in regions)
+
+def test_region_boxes_never_overlap():
+    # An L-shaped cluster whose box reaches over a component near none of its members
+    mask = np.zeros((600, 600), dtype=np.uint8)
+    mask[100:110, 130:500] = 255
+    mask[130:500, 100:110] = 255
+    mask[300:320, 300:320] = 255
+    regions, _ = RegionAnalyzer.analyze(mask)
+    assert boxes(regions) == [(100, 100, 500, 500)]
+
+def bubble_page():
+    page = np.full((800, 800, 3), 100, dtype=np.uint8)
+    cv2.ellipse(page, (400, 400), (150, 100), 0, 0, 360, (255, 255, 255), -1)
+    mask = np.zeros((800, 800), dtype=np.uint8)
+    # Two words further apart than REGION_GAP; the mask is wider than the dark strokes it covers
+    for x in (300, 400):
+        page[398:402, x + 5:x + 35] = 0
+        mask[390:410, x:x + 40] = 255
+    return page, mask
+
+def test_words_in_one_bubble_form_one_region():
+    page, mask = bubble_page()
+    regions, stats = RegionAnalyzer.analyze(mask, page)
+    assert boxes(regions) == [(300, 390, 440, 410)]
+    assert regions[0]["bubble"] != 0 and stats["bubbles"] == 1
+
+def test_bubbles_need_the_page_image():
+    _, mask = bubble_page()
+    regions, stats = RegionAnalyzer.analyze(mask)
+    assert len(regions) == 2 and stats["bubbles"] == 0
+
+def test_bright_background_is_not_a_bubble():
+    page, mask = bubble_page()
+    page[:] = 255
+    regions, stats = RegionAnalyzer.analyze(mask, page)
+    assert len(regions) == 2 and stats["bubbles"] == 0
+
+def test_empty_mask():
+    regions, stats = RegionAnalyzer.analyze(np.zeros((64, 64), dtype=np.uint8))
+    assert regions == [] and stats["components"] == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from src.backend.result_cache import ResultCache
+from src.utils.config import Config
+from src.utils.paths import Paths
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(Paths, "RESULT_CACHE", str(tmp_path))
+    monkeypatch.setattr(Config, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(ResultCache, "_size", None)
+    return tmp_path
+
+def test_key_is_stable_for_equal_inputs():
+    img = np.arange(300, dtype=np.uint8).reshape(10, 10, 3)
+    assert ResultCache.key("ocr", "m", (1, 2), img) == ResultCache.key("ocr", "m", (1, 2), img.copy())
+
+def test_key_changes_with_every_input():
+    img = np.zeros((10, 10, 3), dtype=np.uint8)
+    base = ResultCache.key("lama", "m", "", img)
+    changed = img.copy()
+    changed[5, 5, 1] = 1
+    assert len({
+        base,
+        ResultCache.key("ocr", "m", "", img),
+        ResultCache.key("lama", "other", "", img),
+        ResultCache.key("lama", "m", (0.3,), img),
+        ResultCache.key("lama", "m", "", changed),
+        # Same bytes, different layout or dtype
+        ResultCache.key("lama", "m", "", img.reshape(10, 30)),
+        ResultCache.key("lama", "m", "", img.view(np.int8)),
+    }) == 7
+
+def test_key_ignores_memory_layout():
+    page = np.random.default_rng(0).integers(0, 255, (64, 64, 4), dtype=np.uint8)
+    view = page[8:40, 16:48, :3]
+    assert not view.flags.c_contiguous
+    assert ResultCache.key("lama", "m", "", view) == ResultCache.key("lama", "m", "", view.copy())
+
+def test_put_get_round_trip(cache_dir):
+    tile = np.random.default_rng(1).integers(0, 255, (40, 30, 3), dtype=np.uint8)
+    key = ResultCache.key("lama", "m", "", tile)
+    assert ResultCache.get(key) is None
+    ResultCache.put(key, tile)
+    assert np.array_equal(ResultCache.get(key), tile)
+
+def test_disabled_cache_stores_nothing(cache_dir, monkeypatch):
+    monkeypatch.setattr(Config, "RESULT_CACHE_ENABLED", False)
+    mask = np.full((8, 8), 255, dtype=np.uint8)
+    key = ResultCache.key("ocr", "m", "", mask)
+    ResultCache.put(key, mask)
+    assert ResultCache.get(key) is None
+    assert not any(cache_dir.iterdir())
+
+def test_clear_removes_entries(cache_dir):
+    mask = np.full((8, 8), 255, dtype=np.uint8)
+    key = ResultCache.key("ocr", "m", "", mask)
+    ResultCache.put(key, mask)
+    ResultCache.clear()
+    assert ResultCache.get(key) is None
@@ -0,0 +1,111 @@
+import os
+import numpy as np
+import pytest
+from src.frontend.mask_layer import MaskLayer
+from src.frontend.session_store import SessionStore
+from src.utils.history import HistoryManager
+from src.utils.paths import Paths
+
+def settle():
+    """Waits for the background packing of cold steps"""
+    HistoryManager._packer.submit(lambda: None).result()
+
+def noise(h, w, c=3, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (h, w, c), dtype=np.uint8)
+
+def edited_session(seed, channels=3):
+    """A page with image and mask steps on both the undo and redo stacks, and a tint change"""
+    img = noise(300, 400, channels, seed)
+    mask = MaskLayer(400, 300)
+    history = HistoryManager()
+    history.push_mask_delta(mask.replace(mask.data, (0, 120, 255)))
+
+    for i in range(3):
+        y = 40 * i
+        history.push_image_action([(10, y, img[y:y + 60, 10:110].copy()), (50, y + 20, img[y + 20:y + 50, 50:250].copy())])
+        img[y:y + 60, 10:250] = 30 * i
+
+        mask.begin_edit()
+        mask.touch(20 * i, 30, 20 * i + 150, 200)
+        mask.data[30:200, 20 * i:20 * i + 150] = 255 - 60 * i
+        history.push_mask_delta(mask.end_edit())
+
+    history.pop_image_undo(img)
+    mask.apply(history.pop_mask_undo(), undo=True)
+    mask.apply(history.pop_mask_undo(), undo=True)
+    settle()
+    return {"img": img, "mask": mask, "history": history}
+
+def image_steps(stack):
+    return [[HistoryManager.unpack(e) for e in step] for step in stack]
+
+def assert_same_steps(a, b):
+    assert len(a) == len(b)
+    for step_a, step_b in zip(image_steps(a), image_steps(b)):
+        assert [(x, y) for x, y, _ in step_a] == [(x, y) for x, y, _ in step_b]
+        assert all(np.array_equal(p, q) for (_, _, p), (_, _, q) in zip(step_a, step_b))
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Paths, "SESSIONS", str(tmp_path))
+    # About one page: adding a second spills the least recently used one
+    return SessionStore(budget_mb=0.5)
+
+@pytest.mark.parametrize("channels", [3, 4])
+def test_spill_restore_round_trip(store, channels):
+    session = edited_session(1, channels)
+    expected = {
+        "img": session["img"].copy(), "mask": session["mask"].data.copy(), "color": session["mask"].color,
+        "img_undo": image_steps(session["history"].img_undo), "img_redo": image_steps(session["history"].img_redo),
+        "mask_undo": list(session["history"].mask_undo), "mask_redo": list(session["history"].mask_redo),
+    }
+    store["a"] = session
+    store["b"] = edited_session(2, channels)
+    assert "a" in store.spilled and "a" not in store.resident
+    assert "a" in store
+
+    restored = store["a"]
+    assert "a" in store.resident and "b" in store.spilled
+    assert restored["img"].dtype == np.uint8 and np.array_equal(restored["img"], expected["img"])
+    assert np.array_equal(restored["mask"].data, expected["mask"])
+    assert restored["mask"].color == expected["color"] == (0, 120, 255)
+
+    h = restored["history"]
+    assert h.limit == session["history"].limit
+    assert_same_steps(h.img_undo, expected["img_undo"])
+    assert_same_steps(h.img_redo, expected["img_redo"])
+    assert h.mask_undo == expected["mask_undo"] and h.mask_redo == expected["mask_redo"]
+
+def test_restored_history_still_undoes(store):
+    session = edited_session(3)
+    original, mask = session["img"].copy(), session["mask"].copy()
+    store["a"] = session
+    store["b"] = edited_session(4)
+    restored = store["a"]
+
+    # Every step replays against the restored page exactly as it would have in RAM
+    img, layer = restored["img"], restored["mask"]
+    while session["history"].pop_image_undo(original): assert restored["history"].pop_image_undo(img)
+    assert restored["history"].pop_image_undo(img) is None
+    assert np.array_equal(img, original)
+    while (delta := session["history"].pop_mask_undo()) is not None:
+        mask.apply(delta, undo=True)
+        layer.apply(restored["history"].pop_mask_undo(), undo=True)
+        assert np.array_equal(layer.data, mask.data) and layer.color == mask.color
+    assert layer.color == MaskLayer.RED
+
+def test_pinned_page_is_never_spilled(store):
+    store.pinned = "a"
+    store["a"] = edited_session(5)
+    store["b"] = edited_session(6)
+    store["c"] = edited_session(7)
+    assert "a" in store.resident and "b" in store.spilled
+
+def test_reassigning_a_spilled_page_drops_its_file(store):
+    store["a"] = edited_session(8)
+    store["b"] = edited_session(9)
+    assert len(os.listdir(store.dir)) == 1
+    store["a"] = fresh = edited_session(10)
+    assert store["a"] is fresh
+    store.clear()
+    assert "a" not in store and "b" not in store
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from src.backend.tile_planner import TilePlanner
+
+def random_mask(seed, h=1500, w=1200, blobs=40):
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    for _ in range(blobs):
+        bw, bh = rng.integers(8, 220, size=2)
+        x, y = rng.integers(0, w - bw), rng.integers(0, h - bh)
+        mask[y:y + bh, x:x + bw] = 255
+    return mask
+
+def owner_count(mask, tiles):
+    count = np.zeros(mask.shape, dtype=np.int32)
+    for t in tiles:
+        for x1, y1, x2, y2 in t["boxes"]:
+            count[y1:y2, x1:x2] += 1
+    return count
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_tile", [512, 1024])
+def test_every_masked_pixel_is_owned_by_exactly_one_tile(seed, max_tile):
+    mask = random_mask(seed)
+    tiles = TilePlanner.plan(mask, max_tile)
+    assert (owner_count(mask, tiles)[mask > 0] == 1).all()
+
+@pytest.mark.parametrize("seed", range(5))
+def test_tiles_fit_the_page_and_the_size_limit(seed):
+    mask = random_mask(seed)
+    h, w = mask.shape
+    for t in TilePlanner.plan(mask, 512):
+        x1, y1, x2, y2 = t["rect"]
+        assert 0 <= x1 < x2 <= w and 0 <= y1 < y2 <= h
+        assert x2 - x1 <= 512 and y2 - y1 <= 512
+        for bx1, by1, bx2, by2 in t["boxes"]:
+            assert x1 <= bx1 and y1 <= by1 and bx2 <= x2 and by2 <= y2
+
+def test_blob_larger_than_a_tile_is_split():
+    mask = np.zeros((3000, 900), dtype=np.uint8)
+    mask[100:2900, 100:800] = 255
+    tiles = TilePlanner.plan(mask, 512)
+    assert len(tiles) > 1
+    assert (owner_count(mask, tiles)[mask > 0] == 1).all()
+
+def test_nearby_blobs_share_one_tile():
+    mask = np.zeros((1000, 1000), dtype=np.uint8)
+    mask[400:420, 400:460] = 255
+    mask[400:420, 480:540] = 255
+    tiles = TilePlanner.plan(mask, 1024)
+    assert len(tiles) == 1
+
+def test_empty_mask_plans_nothing():
+    assert TilePlanner.plan(np.zeros((300, 300), dtype=np.uint8), 512) == []
+
+def test_report_counts_tiles_and_pixels():
+    mask = random_mask(0)
+    tiles = TilePlanner.plan(mask, 512)
+    stats = TilePlanner.report(tiles, mask.shape)
+    assert stats["tiles"] == len(tiles)
+    assert stats["boxes"] == sum(len(t["boxes"]) for t in tiles)
+    assert stats["pixels"] == sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in (t["rect"] for t in tiles))